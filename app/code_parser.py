@@ -1,9 +1,18 @@
 from __future__ import annotations
 
 import ast
+import hashlib
+import keyword
+import multiprocessing
+import os
+import pickle
+import re
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Sequence, Set
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Protocol, Sequence, Set
 
 from .models import (
     AttributeInfo,
@@ -14,6 +23,13 @@ from .models import (
     ProjectModel,
 )
 
+# Предпочтительный загрузчик исходников. Импортируем один раз на модуль, а не на каждый файл;
+# если он недоступен — _read_source_best_effort уходит в fallback.
+try:
+    from .text_loader import read_python_source as _read_python_source
+except Exception:  # pragma: no cover
+    _read_python_source = None  # type: ignore[assignment]
+
 # =============================================================================
 # Helpers
 # =============================================================================
@@ -41,6 +57,56 @@ def _safe_unparse(node: ast.AST) -> str:
             return "<unparseable>"
 
 
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    """
+    Для имени `a` или цепочки `a.b.c` (Attribute над Name) возвращает строку, иначе None.
+
+    Это быстрый путь для самых частых баз/декораторов, который даёт тот же результат,
+    что и `ast.unparse`, без генерации кода по дереву.
+    """
+    parts: List[str] = []
+    while type(node) is ast.Attribute:
+        parts.append(node.attr)  # type: ignore[attr-defined]
+        node = node.value  # type: ignore[attr-defined]
+    if type(node) is not ast.Name:
+        return None
+    if not parts:
+        return node.id  # type: ignore[attr-defined]
+    parts.append(node.id)  # type: ignore[attr-defined]
+    parts.reverse()
+    return ".".join(parts)
+
+
+# Флаги compile() для получения AST без обёртки ast.parse.
+# PyCF_TYPE_COMMENTS намеренно не включаем: с ним «неправильные» `# type:` комментарии
+# превращаются в SyntaxError, и такие файлы перестали бы разбираться.
+# feature_version тоже не фиксируем: выигрыша по времени он не даёт, а закреплённая
+# старая версия грамматики отвергала бы новый синтаксис анализируемых проектов.
+# Лишней починки позиций нет и так: compile() с PyCF_ONLY_AST не вызывает fix_missing_locations.
+_AST_FLAGS = ast.PyCF_ONLY_AST
+
+# Версия формата дискового кэша: менять при изменении моделей/логики визитора.
+_CACHE_VERSION = "3"
+
+# Предел кэша type_str -> имена типов: парсер сервиса живёт весь процесс и видит аннотации
+# произвольных репозиториев, поэтому при переполнении кэш сбрасывается целиком.
+_TYPE_NAMES_CACHE_MAX = 16_384
+
+
+def _source_cache_key(source: str, *, parse_decorators: bool = True) -> str:
+    """
+    Ключ дискового кэша ModuleInfo: хэш исходника + версия формата кэша
+    (+ отметка, если декораторы не разбирались: такие модели неполные).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(_CACHE_VERSION.encode("ascii"))
+    if not parse_decorators:
+        h.update(b"\0nodecorators")
+    h.update(b"\0")
+    h.update(source.encode("utf-8", errors="surrogatepass"))
+    return h.hexdigest()
+
+
 @dataclass(frozen=True)
 class _SourceLoadResult:
     """
@@ -58,6 +124,26 @@ class _SourceLoadResult:
     error: str | None = None
 
 
+def _read_bytes_raw(path: Path) -> bytes:
+    """
+    Читает файл целиком через `os.open`/`os.read`, без буферизованного/текстового IO-слоя.
+
+    Обычно хватает одного `os.read` на размер из fstat; цикл — на случай,
+    если файл растёт во время чтения или ОС вернула меньше данных.
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        size = os.fstat(fd).st_size
+        chunks: List[bytes] = []
+        chunk = os.read(fd, max(size, 1) + 1)
+        while chunk:
+            chunks.append(chunk)
+            chunk = os.read(fd, 1 << 20)
+    finally:
+        os.close(fd)
+    return b"".join(chunks)
+
+
 def _read_source_best_effort(path: Path) -> _SourceLoadResult:
     """
     Загружает исходник «как получится», не руша анализ всего проекта.
@@ -71,9 +157,10 @@ def _read_source_best_effort(path: Path) -> _SourceLoadResult:
     Гарантия: функция *никогда* не выбрасывает исключений.
     """
     try:
-        from .text_loader import read_python_source  # preferred path
+        if _read_python_source is None:
+            raise ImportError("app.text_loader is not available")
 
-        src = read_python_source(path)
+        src = _read_python_source(path)  # preferred path
         # ожидается: src.text, src.encoding, src.used_fallback
         return _SourceLoadResult(
             text=src.text,
@@ -84,7 +171,7 @@ def _read_source_best_effort(path: Path) -> _SourceLoadResult:
     except Exception as e:
         # fallback: читаем как UTF-8 с подменой битых символов
         try:
-            txt = path.read_text(encoding="utf-8", errors="replace")
+            txt = _read_bytes_raw(path).decode("utf-8", errors="replace")
             return _SourceLoadResult(
                 text=txt,
                 encoding="utf-8",
@@ -104,6 +191,122 @@ def _read_source_best_effort(path: Path) -> _SourceLoadResult:
 # AST visitor
 # =============================================================================
 
+# Встроенные типы, для которых не строим composition/aggregation связи.
+_PRIMITIVE_TYPES: FrozenSet[str] = frozenset(
+    {
+        "int",
+        "str",
+        "float",
+        "bool",
+        "dict",
+        "list",
+        "set",
+        "tuple",
+        "None",
+    }
+)
+
+# Простое (возможно, dotted) имя: `X`, `pkg.mod.X`. `[^\W\d]` — буква или `_`.
+_DOTTED_NAME_RE = re.compile(r"[^\W\d]\w*(?:\.[^\W\d]\w*)*")
+
+# Префиксы относительных импортов для типичных уровней вложенности (`from ..x import y`).
+_DOTS: tuple[str, ...] = ("", ".", "..", "...", "....", ".....")
+
+# Поля узлов, в которых могут лежать вложенные statement'ы.
+_BODY_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+
+
+def _build_stmt_fields() -> Dict[type, tuple[str, ...]]:
+    """
+    Для каждого типа statement-узла (а также Module/ExceptHandler/match_case)
+    предвычисляет кортеж полей, содержащих списки statement'ов.
+
+    Выражения (`Assign.value`, аргументы вызовов, comprehension'ы и т.п.) не содержат
+    statement'ов, поэтому визитору модуля туда спускаться не нужно.
+    """
+    roots: List[type] = [ast.Module, ast.ExceptHandler, ast.match_case]
+    stack: List[type] = [ast.stmt]
+    while stack:
+        t = stack.pop()
+        roots.append(t)
+        stack.extend(t.__subclasses__())
+
+    table: Dict[type, tuple[str, ...]] = {}
+    for t in roots:
+        fields = tuple(f for f in getattr(t, "_fields", ()) if f in _BODY_FIELDS)
+        if fields:
+            table[t] = fields
+    return table
+
+
+_STMT_FIELDS: Dict[type, tuple[str, ...]] = _build_stmt_fields()
+
+
+def _collect_type_names(node: ast.AST) -> tuple[str, ...]:
+    """
+    Собирает «именованные» типы из аннотации итеративным обходом (без NodeVisitor).
+
+    Порядок результата — порядок появления в исходнике (без дублей), поэтому связи
+    в моделях и диаграммах детерминированы и не зависят от хэш-рандомизации строк.
+
+    - Name: `T` -> "T"
+    - Attribute: `pkg.T` -> "T" (в value не спускаемся)
+    - Constant(str): forward-ref — парсим строку как выражение и продолжаем обход
+    - остальные узлы: обходим детей
+
+    Имена интернируются: одни и те же типы повторяются по всему проекту,
+    а интернированные строки сравниваются по указателю и не дублируются в памяти.
+    """
+    names: Dict[str, None] = {}
+    stack: List[ast.AST] = [node]
+    while stack:
+        n = stack.pop()
+        t = type(n)
+        if t is ast.Name:
+            names[sys.intern(n.id)] = None  # type: ignore[attr-defined]
+        elif t is ast.Attribute:
+            names[sys.intern(n.attr)] = None  # type: ignore[attr-defined]
+        elif t is ast.Constant:
+            value = n.value  # type: ignore[attr-defined]
+            if isinstance(value, str):
+                try:
+                    stack.append(ast.parse(value, mode="eval").body)
+                except SyntaxError:
+                    # не распарсили forward-ref — просто пропускаем
+                    pass
+        else:
+            # reversed: со стека дети снимаются в исходном порядке
+            stack.extend(reversed(list(ast.iter_child_nodes(n))))
+    return tuple(names)
+
+
+class ParserHook(Protocol):
+    """
+    Внешний обработчик узлов, вызываемый в рамках *того же* обхода AST, что и _ModuleVisitor
+    (один проход по дереву на всех потребителей).
+
+    handles:
+      типы узлов, которые интересны хуку. Визитор спускается только по statement'ам,
+      поэтому имеют смысл типы statement'ов (и ast.Module).
+    """
+
+    handles: tuple[type, ...]
+
+    def __call__(self, node: ast.AST) -> None: ...
+
+
+def _chain_hooks(hooks: tuple[ParserHook, ...], base: Callable[[Any], None]) -> Callable[[Any], None]:
+    """
+    Обработчик узла: сначала хуки (в порядке регистрации), затем штатный visit_*.
+    """
+
+    def run(node: ast.AST) -> None:
+        for hook in hooks:
+            hook(node)
+        base(node)
+
+    return run
+
 
 class _ModuleVisitor(ast.NodeVisitor):
     """
@@ -126,33 +329,114 @@ class _ModuleVisitor(ast.NodeVisitor):
     - Используется дедупликация атрибутов и связей (через _seen_*).
     """
 
-    _PRIMITIVE_TYPES: Set[str] = {
-        "int",
-        "str",
-        "float",
-        "bool",
-        "dict",
-        "list",
-        "set",
-        "tuple",
-        "None",
-    }
-
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        type_names_cache: Optional[Dict[str, tuple[str, ...]]] = None,
+        hooks: Sequence[ParserHook] = (),
+        parse_decorators: bool = True,
+    ) -> None:
         self.imports: List[str] = []
         self.functions: List[FunctionInfo] = []
         self.classes: List[ClassInfo] = []
 
         # Текущий контекст обхода:
         self._class_stack: List[ClassInfo] = []
-        self._function_depth: int = 0  # для отслеживания top-level функций
-        self._function_stack: List[str] = []  # имена функций (для определения scope)
+        self._function_depth: int = 0  # глубина вложенности функций (0 -> вне функций)
+        self._in_init: bool = False  # самая внутренняя функция — это __init__
+        # False -> FunctionInfo.decorators остаются пустыми (unparse декораторов не делается).
+        self._parse_decorators = parse_decorators
+
+        # Дедупликация (по каждому классу отдельно, ключ — id(ClassInfo);
+        # ClassInfo живут в self.classes до конца обхода, поэтому id стабилен):
+        # id(cls) -> {attr}: отдельно для атрибутов экземпляра и класса, чтобы ключом
+        # было само имя (хэш строки кэширован) без сборки tuple на каждую проверку.
+        self._seen_instance_attrs: Dict[int, Set[str]] = {}
+        self._seen_class_attrs: Dict[int, Set[str]] = {}
+        # id(cls) -> {(attr, B, kind)}
+        self._seen_comps: Dict[int, Set[tuple[str, str, str]]] = {}
+
+        # Диспетчеризация по типу узла без `"visit_" + name` + getattr на каждый узел.
+        self._dispatch: Dict[type, Callable[[Any], None]] = {
+            ast.Import: self.visit_Import,
+            ast.ImportFrom: self.visit_ImportFrom,
+            ast.ClassDef: self.visit_ClassDef,
+            ast.FunctionDef: self.visit_FunctionDef,
+            ast.AsyncFunctionDef: self.visit_FunctionDef,
+            ast.AnnAssign: self.visit_AnnAssign,
+            ast.Assign: self.visit_Assign,
+        }
+        if hooks:
+            self._install_hooks(hooks)
+
+        # Кэши строкового представления:
+        # id(node) -> unparse; узлы живут всё время обхода, поэтому id стабилен.
+        self._unparse_cache: Dict[int, str] = {}
+        # type_str -> имена типов; может разделяться между файлами (см. CodeParser).
+        self._type_names_cache: Dict[str, tuple[str, ...]] = (
+            type_names_cache if type_names_cache is not None else {}
+        )
 
-        # Дедупликация:
-        # (ClassName, attr, is_instance)
-        self._seen_attrs: Set[tuple[str, str, bool]] = set()
-        # (A, attr, B, kind)
-        self._seen_comps: Set[tuple[str, str, str, str]] = set()
+    # -------------------------------------------------------------------------
+    # Traversal
+    # -------------------------------------------------------------------------
+
+    def visit(self, node: ast.AST) -> None:
+        """
+        Диспетчеризует узел через предвычисленную таблицу `_dispatch`.
+        """
+        fn = self._dispatch.get(type(node))
+        if fn is not None:
+            fn(node)
+        else:
+            self.generic_visit(node)
+
+    def _install_hooks(self, hooks: Sequence[ParserHook]) -> None:
+        """
+        Встраивает внешние хуки в таблицу диспетчеризации.
+
+        Для каждого типа из `hook.handles` хук вызывается *до* штатной обработки узла
+        (pre-order), затем выполняется обычный visit_*/generic_visit. Типы без хуков
+        остаются с исходным обработчиком, поэтому без хуков накладных расходов нет.
+        """
+        by_type: Dict[type, List[ParserHook]] = {}
+        for hook in hooks:
+            handles = getattr(hook, "handles", None)
+            if not handles:
+                raise ValueError(f"parser hook {hook!r} must declare non-empty 'handles'")
+            for node_type in handles:
+                by_type.setdefault(node_type, []).append(hook)
+
+        for node_type, type_hooks in by_type.items():
+            base = self._dispatch.get(node_type, self.generic_visit)
+            self._dispatch[node_type] = _chain_hooks(tuple(type_hooks), base)
+
+    def generic_visit(self, node: ast.AST) -> None:
+        """
+        Обходит только statement-поля узла (body/orelse/finalbody/handlers/cases).
+
+        Все интересующие нас узлы (импорты, классы, функции, присваивания) — statement'ы,
+        поэтому спуск в поддеревья выражений — чистые накладные расходы.
+        """
+        fields = _STMT_FIELDS.get(type(node))
+        if not fields:
+            return
+        for field in fields:
+            self._visit_stmts(getattr(node, field))
+
+    def _visit_stmts(self, stmts: Sequence[ast.AST]) -> None:
+        """
+        Обходит список statement'ов (тело модуля/класса/функции/ветки).
+
+        Диспетчеризация детей inline (без лишнего вызова self.visit на каждый узел);
+        «листовые» statement'ы (Expr/Return/Pass/...) без обработчика просто пропускаем.
+        """
+        dispatch = self._dispatch.get
+        for child in stmts:
+            fn = dispatch(type(child))
+            if fn is not None:
+                fn(child)
+            elif type(child) in _STMT_FIELDS:
+                self.generic_visit(child)
 
     # -------------------------------------------------------------------------
     # Imports
@@ -161,13 +445,17 @@ class _ModuleVisitor(ast.NodeVisitor):
     def visit_Import(self, node: ast.Import) -> None:  # type: ignore[override]
         """
         Превращает `import x [as y]` в строку и сохраняет в imports.
+
+        Дочерние узлы — только alias (строки), поэтому generic_visit не вызываем.
         """
+        append = self.imports.append
+        intern = sys.intern
         for alias in node.names:
-            if alias.asname:
-                self.imports.append(f"import {alias.name} as {alias.asname}")
+            asname = alias.asname
+            if asname:
+                append(intern(f"import {alias.name} as {asname}"))
             else:
-                self.imports.append(f"import {alias.name}")
-        self.generic_visit(node)
+                append(intern("import " + alias.name))
 
     def visit_ImportFrom(self, node: ast.ImportFrom) -> None:  # type: ignore[override]
         """
@@ -175,17 +463,19 @@ class _ModuleVisitor(ast.NodeVisitor):
 
         Поддерживает относительные импорты (`level`) через префикс точек.
         """
-        if node.level or node.module:
-            module = "." * node.level + (node.module or "")
-        else:
-            module = ""
+        level = node.level or 0
+        dots = _DOTS[level] if level < len(_DOTS) else "." * level
+        # Префикс общий для всех alias'ов statement'а — собираем его один раз.
+        prefix = f"from {dots}{node.module or ''} import "
 
+        append = self.imports.append
+        intern = sys.intern
         for alias in node.names:
-            if alias.asname:
-                self.imports.append(f"from {module} import {alias.name} as {alias.asname}")
+            asname = alias.asname
+            if asname:
+                append(intern(f"{prefix}{alias.name} as {asname}"))
             else:
-                self.imports.append(f"from {module} import {alias.name}")
-        self.generic_visit(node)
+                append(intern(prefix + alias.name))
 
     # -------------------------------------------------------------------------
     # Classes / Functions
@@ -195,45 +485,38 @@ class _ModuleVisitor(ast.NodeVisitor):
         """
         Регистрирует класс и запускает обход его тела.
         """
-        bases = [_safe_unparse(base) for base in node.bases] if node.bases else []
+        bases = [self._unparse(base) for base in node.bases] if node.bases else []
 
         class_info = ClassInfo(
-            name=node.name,
+            name=sys.intern(node.name),
             bases=bases,
             methods=[],
-            lineno=getattr(node, "lineno", None),
+            lineno=node.lineno,
         )
 
         self.classes.append(class_info)
         self._class_stack.append(class_info)
 
-        self.generic_visit(node)
+        # Базы/декораторы уже разобраны выше — обходим только тело.
+        self._visit_stmts(node.body)
 
         self._class_stack.pop()
 
-    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:  # type: ignore[override]
-        """
-        Обрабатывает обычную функцию/метод: собирает метаданные и обходит тело.
+    def visit_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:  # type: ignore[override]
         """
-        self._handle_function_like(node)
+        Обрабатывает функцию/метод (обычную и async): собирает метаданные и обходит тело.
 
-        self._function_stack.append(node.name)
-        self._function_depth += 1
-        self.generic_visit(node)
-        self._function_depth -= 1
-        self._function_stack.pop()
-
-    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:  # type: ignore[override]
-        """
-        Обрабатывает async-функцию/метод: поведение аналогично обычной функции.
+        AsyncFunctionDef диспетчеризуется сюда же — обработка идентична.
         """
         self._handle_function_like(node)
 
-        self._function_stack.append(node.name)
+        outer_in_init = self._in_init
+        self._in_init = node.name == "__init__"
         self._function_depth += 1
-        self.generic_visit(node)
+        # Аргументы/аннотации/декораторы — выражения, statement'ы есть только в теле.
+        self._visit_stmts(node.body)
         self._function_depth -= 1
-        self._function_stack.pop()
+        self._in_init = outer_in_init
 
     # -------------------------------------------------------------------------
     # Attributes / Composition
@@ -246,30 +529,38 @@ class _ModuleVisitor(ast.NodeVisitor):
         Сценарии:
         - self.x: T = ...  -> instance attr (+ aggregation связь по аннотации)
         - x: T = ...       -> class attr    (+ aggregation связь по аннотации)
+
+        Вложенных statement'ов у AnnAssign нет, поэтому generic_visit не нужен.
         """
         if not self._class_stack:
-            return self.generic_visit(node)
+            return
 
         current_class = self._class_stack[-1]
-        lineno = getattr(node, "lineno", None)
-
-        # self.x: T = ...
-        self_attr = self._get_self_attr_name(node.target)
-        if self_attr and self._in_method_scope():
-            anno_str = _safe_unparse(node.annotation) if node.annotation else None
-            self._add_instance_attr(current_class, self_attr, anno_str, lineno)
-            for t in self._extract_type_names(node.annotation):
-                self._add_composition(current_class, self_attr, t, lineno, kind="aggregation")
-
-        # x: T = ... (class attr)
-        if isinstance(node.target, ast.Name) and not self._in_method_scope():
-            name = node.target.id
-            anno_str = _safe_unparse(node.annotation) if node.annotation else None
-            self._add_class_attr(current_class, name, anno_str, lineno)
-            for t in self._extract_type_names(node.annotation):
-                self._add_composition(current_class, name, t, lineno, kind="aggregation")
-
-        self.generic_visit(node)
+        target = node.target
+
+        # `type(...) is` вместо isinstance: у конкретных AST-классов нет наследников.
+        if self._in_method_scope():
+            # self.x: T = ...
+            if not (
+                type(target) is ast.Attribute
+                and type(target.value) is ast.Name
+                and target.value.id == "self"
+            ):
+                return
+            name = target.attr
+            add_attr = self._add_instance_attr
+        elif type(target) is ast.Name:
+            # x: T = ... (class attr)
+            name = target.id
+            add_attr = self._add_class_attr
+        else:
+            return
+
+        lineno = node.lineno
+        anno_str = self._unparse(node.annotation) if node.annotation else None
+        add_attr(current_class, name, anno_str, lineno)
+        for t in self._extract_type_names(node.annotation):
+            self._add_composition(current_class, name, t, lineno, kind="aggregation")
 
     def visit_Assign(self, node: ast.Assign) -> None:  # type: ignore[override]
         """
@@ -281,35 +572,35 @@ class _ModuleVisitor(ast.NodeVisitor):
 
         Примечание:
         - Тип выводится *только* для `ast.Call` (как и было), иначе None.
+        - RHS общий для всех targets (`a = b = X()`), поэтому тип выводится один раз.
         """
         if not self._class_stack:
-            return self.generic_visit(node)
+            return
 
         current_class = self._class_stack[-1]
         in_method = self._in_method_scope()
-        lineno = getattr(node, "lineno", None)
+        lineno = node.lineno
 
-        for tgt in node.targets:
-            # self.x = ...
-            attr = self._get_self_attr_name(tgt)
-            if attr and in_method:
-                inferred = self._infer_type_from_value(node.value)
-                self._add_instance_attr(current_class, attr, inferred, lineno)
-                if inferred:
-                    for t in self._extract_type_names_from_str(inferred):
-                        self._add_composition(current_class, attr, t, lineno, kind="composition")
-                continue
+        value = node.value
+        inferred = self._unparse(value.func) if type(value) is ast.Call else None
+        type_names = self._extract_type_names_from_str(inferred) if inferred else ()
 
-            # x = ... (class attr)
-            if isinstance(tgt, ast.Name) and not in_method:
+        for tgt in node.targets:
+            if in_method:
+                # self.x = ...
+                if not (type(tgt) is ast.Attribute and type(tgt.value) is ast.Name and tgt.value.id == "self"):
+                    continue
+                name = tgt.attr
+                self._add_instance_attr(current_class, name, inferred, lineno)
+            elif type(tgt) is ast.Name:
+                # x = ... (class attr)
                 name = tgt.id
-                inferred = self._infer_type_from_value(node.value)
                 self._add_class_attr(current_class, name, inferred, lineno)
-                if inferred:
-                    for t in self._extract_type_names_from_str(inferred):
-                        self._add_composition(current_class, name, t, lineno, kind="composition")
+            else:
+                continue
 
-        self.generic_visit(node)
+            for t in type_names:
+                self._add_composition(current_class, name, t, lineno, kind="composition")
 
     # -------------------------------------------------------------------------
     # Internals
@@ -326,11 +617,15 @@ class _ModuleVisitor(ast.NodeVisitor):
         - Если мы не внутри класса и это top-level функция (depth == 0) ->
           добавляем в `self.functions`
         """
-        decorators = [_safe_unparse(dec) for dec in node.decorator_list] if node.decorator_list else []
+        decorators = (
+            [self._unparse(dec) for dec in node.decorator_list]
+            if node.decorator_list and self._parse_decorators
+            else []
+        )
 
         func_info = FunctionInfo(
-            name=node.name,
-            lineno=getattr(node, "lineno", None),
+            name=sys.intern(node.name),
+            lineno=node.lineno,
             decorators=decorators,
         )
 
@@ -345,34 +640,46 @@ class _ModuleVisitor(ast.NodeVisitor):
         if self._function_depth == 0:
             self.functions.append(func_info)
 
+    def _unparse(self, node: ast.AST) -> str:
+        """
+        `_safe_unparse` с кэшем по id(node).
+
+        Один и тот же узел может встречаться несколько раз
+        (например, общая аннотация/декоратор при повторных обращениях).
+        Простые имена (`Base`, `pkg.Base`, `staticmethod`) — большинство баз и декораторов —
+        собираются напрямую, без `ast.unparse`.
+        """
+        dotted = _dotted_name(node)
+        if dotted is not None:
+            return dotted
+
+        key = id(node)
+        res = self._unparse_cache.get(key)
+        if res is None:
+            res = _safe_unparse(node)
+            self._unparse_cache[key] = res
+        return res
+
     def _in_method_scope(self) -> bool:
         """
         True, если мы находимся внутри функции/метода (неважно какого уровня вложенности).
         """
-        return bool(self._function_stack)
+        return self._function_depth > 0
 
     def _is_in_init(self) -> bool:
         """
         True, если текущая функция — это __init__ (используется в метаданных атрибутов).
         """
-        return bool(self._function_stack) and self._function_stack[-1] == "__init__"
-
-    def _get_self_attr_name(self, target: ast.AST) -> Optional[str]:
-        """
-        Если target имеет вид `self.<attr>`, возвращает имя attr, иначе None.
-        """
-        if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) and target.value.id == "self":
-            return target.attr
-        return None
+        return self._in_init
 
     def _add_instance_attr(self, cls: ClassInfo, name: str, type_str: Optional[str], lineno: Optional[int]) -> None:
         """
         Добавляет атрибут экземпляра (self.x) с дедупликацией.
         """
-        key = (cls.name, name, True)
-        if key in self._seen_attrs:
+        seen = self._seen_instance_attrs.setdefault(id(cls), set())
+        if name in seen:
             return
-        self._seen_attrs.add(key)
+        seen.add(name)
 
         cls.attributes.append(
             AttributeInfo(
@@ -388,10 +695,10 @@ class _ModuleVisitor(ast.NodeVisitor):
         """
         Добавляет атрибут класса (x = ...) с дедупликацией.
         """
-        key = (cls.name, name, False)
-        if key in self._seen_attrs:
+        seen = self._seen_class_attrs.setdefault(id(cls), set())
+        if name in seen:
             return
-        self._seen_attrs.add(key)
+        seen.add(name)
 
         cls.attributes.append(
             AttributeInfo(
@@ -419,13 +726,18 @@ class _ModuleVisitor(ast.NodeVisitor):
         - "composition": тип выведен из присваивания (обычно `Call(...)`)
         - "aggregation": тип взят из аннотации
         """
-        if target in self._PRIMITIVE_TYPES:
+        # Примитивы и пустые имена отсекаем до того, как собирать ключ дедупликации.
+        if not target or target in _PRIMITIVE_TYPES:
             return
 
-        key = (cls.name, attr, target, kind)
-        if key in self._seen_comps:
+        seen = self._seen_comps.get(id(cls))
+        if seen is None:
+            seen = self._seen_comps[id(cls)] = set()
+        # Одно хэширование ключа вместо `in` + `add`: новая связь меняет размер множества.
+        size = len(seen)
+        seen.add((attr, target, kind))
+        if len(seen) == size:
             return
-        self._seen_comps.add(key)
 
         cls.compositions.append(
             CompositionInfo(
@@ -437,18 +749,7 @@ class _ModuleVisitor(ast.NodeVisitor):
             )
         )
 
-    def _infer_type_from_value(self, value: ast.AST) -> Optional[str]:
-        """
-        Очень простая эвристика вывода типа из RHS:
-
-        - если RHS это вызов `X(...)` -> считаем типом `X`
-        - иначе -> None
-        """
-        if isinstance(value, ast.Call):
-            return _safe_unparse(value.func)
-        return None
-
-    def _extract_type_names(self, node: Optional[ast.AST]) -> Set[str]:
+    def _extract_type_names(self, node: Optional[ast.AST]) -> tuple[str, ...]:
         """
         Извлекает «именованные» типы из аннотации.
 
@@ -458,38 +759,39 @@ class _ModuleVisitor(ast.NodeVisitor):
         - Constant(str): forward-ref `'T'` или `'pkg.T'` (парсим как expr)
         """
         if node is None:
-            return set()
+            return ()
 
-        names: Set[str] = set()
+        return _collect_type_names(node)
 
-        class _TypeNameVisitor(ast.NodeVisitor):
-            def visit_Name(self, n: ast.Name) -> None:  # type: ignore[override]
-                names.add(n.id)
-
-            def visit_Attribute(self, n: ast.Attribute) -> None:  # type: ignore[override]
-                names.add(n.attr)
-
-            def visit_Constant(self, n: ast.Constant) -> None:  # type: ignore[override]
-                if isinstance(n.value, str):
-                    try:
-                        expr = ast.parse(n.value, mode="eval").body
-                        self.visit(expr)
-                    except SyntaxError:
-                        # не распарсили forward-ref — просто пропускаем
-                        pass
-
-        _TypeNameVisitor().visit(node)
-        return names
-
-    def _extract_type_names_from_str(self, type_str: str) -> Set[str]:
+    def _extract_type_names_from_str(self, type_str: str) -> tuple[str, ...]:
         """
         То же самое, что _extract_type_names, но вход — строка (например, от infer).
+
+        Результат мемоизируется по строке: одни и те же типы (`Path`, `Optional[str]`)
+        повторяются по проекту сотни раз, а `ast.parse` на каждый — дорого.
+        Простые dotted-имена (типичный результат infer: `X`, `pkg.X`) разбираются
+        регуляркой без парсера; всё остальное — через `ast.parse`.
         """
-        try:
-            expr = ast.parse(type_str, mode="eval").body
-            return self._extract_type_names(expr)
-        except SyntaxError:
-            return set()
+        cached = self._type_names_cache.get(type_str)
+        if cached is not None:
+            return cached
+
+        if _DOTTED_NAME_RE.fullmatch(type_str) and not any(
+            keyword.iskeyword(part) for part in type_str.split(".")
+        ):
+            # `X` / `pkg.mod.X`: AST-путь дал бы последний сегмент (Name.id / Attribute.attr).
+            names: tuple[str, ...] = (sys.intern(type_str.rpartition(".")[2]),)
+        else:
+            try:
+                expr = ast.parse(type_str, mode="eval").body
+                names = self._extract_type_names(expr)
+            except SyntaxError:
+                names = ()
+
+        if len(self._type_names_cache) >= _TYPE_NAMES_CACHE_MAX:
+            self._type_names_cache.clear()
+        self._type_names_cache[type_str] = names
+        return names
 
 
 # =============================================================================
@@ -504,34 +806,127 @@ class CodeParser:
     Главная цель: *надёжность*.
     - best-effort чтение исходников (включая случаи с проблемной кодировкой)
     - ошибки парсинга не валят весь анализ
-    - в случае проблем возвращается пустой ModuleInfo + метаданные об ошибке (через setattr)
+    - в случае проблем возвращается пустой ModuleInfo + метаданные об ошибке (parse_error/source_error)
 
     Важно:
     - API класса предсказуем: `parse_file()` и `parse_files()` всегда возвращают модели,
       даже если часть файлов битые/непарсятся.
     """
 
-    def parse_file(self, path: str | Path) -> ModuleInfo:
+    def __init__(
+        self,
+        *,
+        max_workers: Optional[int] = None,
+        parallel_min_files: int = 8,
+        cache_dir: Optional[Path] = None,
+        cache_max_entries: int = 10_000,
+        resolve_paths: bool = True,
+        memo_max_entries: int = 4096,
+        parse_decorators: bool = True,
+        mp_start_method: Optional[str] = None,
+        keep_pool: bool = False,
+    ) -> None:
+        """
+        max_workers:
+          число процессов для parse_files (None -> os.cpu_count(), 1 -> без пула).
+        parallel_min_files:
+          минимальное число файлов, начиная с которого имеет смысл поднимать пул
+          (старт процессов дороже, чем парсинг пары файлов).
+        cache_dir:
+          директория дискового кэша ModuleInfo (ключ — хэш исходника). None -> кэш выключен.
+          Кэш хранится в pickle, поэтому директория должна быть доверенной.
+        cache_max_entries:
+          верхняя граница числа записей в кэше; самые старые (по mtime) удаляются.
+        resolve_paths:
+          делать ли `Path.resolve()` (realpath-syscall) для каждого файла. Можно выключить,
+          если пути уже абсолютные и без symlink'ов (например, результат FileScanner);
+          относительные пути резолвятся всегда.
+        memo_max_entries:
+          размер in-memory кэша ModuleInfo по ключу (path, st_mtime_ns, st_size):
+          неизменённый файл при повторном разборе тем же парсером не читается вовсе.
+          Каждый вызов получает собственную копию модуля. 0 -> выключен.
+        parse_decorators:
+          заполнять ли FunctionInfo.decorators. Диаграммам декораторы не нужны, а их
+          ast.unparse — заметная часть времени разбора; False пропускает эту работу.
+        mp_start_method:
+          способ старта процессов пула ("fork" / "forkserver" / "spawn"; None -> по умолчанию
+          для платформы). В многопоточном процессе (веб-сервер) fork небезопасен: дочерний
+          процесс наследует локи, захваченные другими потоками, и может повиснуть на них.
+        keep_pool:
+          держать пул между вызовами parse_files (закрывается через close()), чтобы не платить
+          за старт процессов на каждый прогон. Для долгоживущего парсера сервиса.
+        """
+        self.max_workers = max_workers
+        self.parallel_min_files = parallel_min_files
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir is not None else None
+        self.cache_max_entries = cache_max_entries
+        self.resolve_paths = resolve_paths
+
+        self.memo_max_entries = memo_max_entries
+        self.parse_decorators = parse_decorators
+
+        # Разделяемый между файлами кэш: type_str -> имена типов (см. _ModuleVisitor);
+        # ограничен _TYPE_NAMES_CACHE_MAX записей.
+        self._type_names_cache: Dict[str, tuple[str, ...]] = {}
+        # (path, st_mtime_ns, st_size) -> pickle ModuleInfo; порядок вставки = порядок использования.
+        # Храним байты, а не объекты: каждый вызов получает свою копию, и изменения результата
+        # вызывающим кодом не протекают в memo (парсер общий для запросов сервиса).
+        self._memo: Dict[tuple[Path, int, int], bytes] = {}
+        # Парсер может разделяться между потоками сервиса (threadpool FastAPI).
+        self._memo_lock = threading.Lock()
+
+        self.mp_start_method = mp_start_method
+        self.keep_pool = keep_pool
+        # Пул при keep_pool=True: (число воркеров, executor); создаётся лениво под _pool_lock.
+        self._pool: Optional[tuple[int, ProcessPoolExecutor]] = None
+        self._pool_lock = threading.Lock()
+
+    def parse_file(self, path: str | Path, *, hooks: Sequence[ParserHook] = ()) -> ModuleInfo:
         """
         Парсит один файл и возвращает ModuleInfo.
 
+        hooks:
+          дополнительные обработчики узлов (см. ParserHook), вызываемые в том же обходе AST.
+          С хуками кэши (in-memory и дисковый) не используются: хукам нужен реальный обход дерева.
+
         Гарантии:
         - не бросает исключения наружу из-за ошибок чтения/парсинга (максимум вернёт пустую модель)
-        - при проблемах добавляет атрибуты:
+        - заполняет поля наблюдаемости ModuleInfo:
             * source_encoding, source_used_fallback, source_error
             * parse_error
-          (через setattr, чтобы не зависеть от того, есть ли поля в dataclass)
         """
-        path = Path(path).expanduser().resolve()
+        path = self._normalize_path(path)
+
+        memo_key = self._memo_key(path) if not hooks else None
+        if memo_key is not None:
+            memoized = self._memo_get(memo_key)
+            if memoized is not None:
+                return memoized
 
         src = _read_source_best_effort(path)
         source = src.text
 
-        visitor = _ModuleVisitor()
+        cache_key: str | None = None
+        if self.cache_dir is not None and not hooks:
+            cache_key = _source_cache_key(source, parse_decorators=self.parse_decorators)
+            cached = self._cache_load(cache_key)
+            if cached is not None:
+                # Ключ зависит только от содержимого: путь подставляем текущий.
+                cached.path = path
+                if memo_key is not None:
+                    self._memo_put(memo_key, cached)
+                return cached
+
+        visitor = _ModuleVisitor(
+            type_names_cache=self._type_names_cache,
+            hooks=hooks,
+            parse_decorators=self.parse_decorators,
+        )
 
         parse_error: str | None = None
         try:
-            tree = ast.parse(source, filename=str(path))
+            # dont_inherit=True: не наследуем __future__-флаги этого модуля.
+            tree = compile(source, str(path), "exec", flags=_AST_FLAGS, dont_inherit=True)
             visitor.visit(tree)
         except SyntaxError as e:
             parse_error = (
@@ -545,42 +940,305 @@ class CodeParser:
             classes=visitor.classes if parse_error is None else [],
             functions=visitor.functions if parse_error is None else [],
             imports=visitor.imports if parse_error is None else [],
+            source_encoding=src.encoding,
+            source_used_fallback=src.used_fallback,
+            source_error=src.error,
+            parse_error=parse_error,
         )
 
-        # Наблюдаемость без риска сломать модель: поля могут отсутствовать, поэтому setattr.
-        try:
-            setattr(module, "source_encoding", src.encoding)
-            setattr(module, "source_used_fallback", src.used_fallback)
-            if src.error:
-                setattr(module, "source_error", src.error)
-            if parse_error:
-                setattr(module, "parse_error", parse_error)
-        except Exception:
-            pass
+        if cache_key is not None:
+            self._cache_store(cache_key, module)
+        if memo_key is not None:
+            self._memo_put(memo_key, module)
 
         return module
 
-    def parse_files(self, paths: Sequence[str | Path]) -> ProjectModel:
+    def parse_files(self, paths: Sequence[str | Path], *, hooks: Sequence[ParserHook] = ()) -> ProjectModel:
         """
         Парсит набор файлов и возвращает ProjectModel(modules=[...]).
 
         Поведение:
         - каждый файл парсится независимо
+        - если файлов достаточно много (>= parallel_min_files) и max_workers != 1,
+          файлы парсятся в пуле процессов; порядок модулей совпадает с порядком paths
+        - если пул недоступен (нет fork/semaphores в окружении и т.п.) — последовательный fallback
+        - с hooks парсинг всегда последовательный: хуки копят состояние в текущем процессе
         - если parse_file по какой-то причине выбросил исключение (это крайний случай),
-          мы добавляем пустой ModuleInfo и сохраняем parse_error через setattr
+          мы добавляем пустой ModuleInfo с заполненным parse_error
         """
-        modules: List[ModuleInfo] = []
-        for p in paths:
+        paths = list(paths)
+
+        workers = 1 if hooks else self._effective_workers(len(paths))
+        if workers > 1:
             try:
-                modules.append(self.parse_file(p))
-            except Exception as e:
-                # Absolute last-resort: никогда не падаем всем прогоном из-за одного файла.
-                path = Path(p).expanduser().resolve()
-                m = ModuleInfo(path=path, classes=[], functions=[], imports=[])
+                modules = self._parse_files_parallel(paths, workers)
+                self._prune_cache()
+                return ProjectModel(modules=modules)
+            except Exception:
+                # Пул не поднялся/сломался — не роняем анализ, парсим последовательно.
+                pass
+
+        modules = [self._parse_file_safe(p, hooks=hooks) for p in paths]
+        self._prune_cache()
+        return ProjectModel(modules=modules)
+
+    def _parse_files_parallel(self, paths: List[str | Path], workers: int) -> List[ModuleInfo]:
+        """
+        Параллельный разбор: memo-попадания берём сразу, в пул отправляем только промахи.
+        """
+        modules: List[Optional[ModuleInfo]] = [None] * len(paths)
+        keys: List[Optional[tuple[Path, int, int]]] = [None] * len(paths)
+        misses: List[int] = []
+        for i, p in enumerate(paths):
+            try:
+                keys[i] = self._memo_key(self._normalize_path(p))
+            except Exception:
+                keys[i] = None
+            key = keys[i]
+            modules[i] = self._memo_get(key) if key is not None else None
+            if modules[i] is None:
+                misses.append(i)
+
+        if misses:
+            if self.keep_pool:
+                # Общий пул: размер фиксирован при создании, чанки считаем под него.
+                pool_workers, executor = self._shared_pool(workers)
+                workers = max(1, min(pool_workers, len(misses)))
                 try:
-                    setattr(m, "parse_error", f"UnhandledError: {type(e).__name__}: {e}")
+                    self._map_misses(executor, paths, keys, modules, misses, workers)
                 except Exception:
-                    pass
-                modules.append(m)
+                    # Сломанный пул (BrokenProcessPool и т.п.) не переиспользуем.
+                    self._discard_pool(executor)
+                    raise
+            else:
+                workers = max(1, min(workers, len(misses)))
+                with self._new_pool(workers) as executor:
+                    self._map_misses(executor, paths, keys, modules, misses, workers)
 
-        return ProjectModel(modules=modules)
+        return [m for m in modules if m is not None]
+
+    def _map_misses(
+        self,
+        executor: ProcessPoolExecutor,
+        paths: List[str | Path],
+        keys: List[Optional[tuple[Path, int, int]]],
+        modules: List[Optional[ModuleInfo]],
+        misses: List[int],
+        workers: int,
+    ) -> None:
+        """Разбирает промахи memo в пуле и кладёт результаты в modules/memo."""
+        chunksize = max(1, len(misses) // (4 * max(1, workers)))
+        # В воркеры отдаём str, а не Path: меньше pickle-трафика через IPC.
+        parsed = executor.map(
+            _parse_one_in_worker,
+            [os.fspath(paths[i]) for i in misses],
+            chunksize=chunksize,
+        )
+        for i, module in zip(misses, parsed):
+            modules[i] = module
+            key = keys[i]
+            if key is not None:
+                self._memo_put(key, module)
+
+    def _new_pool(self, workers: int) -> ProcessPoolExecutor:
+        """ProcessPoolExecutor с настройками парсера (initializer, способ старта процессов)."""
+        mp_context = multiprocessing.get_context(self.mp_start_method) if self.mp_start_method else None
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(self.cache_dir, self.resolve_paths, self.parse_decorators),
+        )
+
+    def _shared_pool(self, workers: int) -> tuple[int, ProcessPoolExecutor]:
+        """Долгоживущий пул для keep_pool=True: создаётся один раз на workers процессов."""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = (workers, self._new_pool(workers))
+            return self._pool
+
+    def _discard_pool(self, executor: ProcessPoolExecutor) -> None:
+        with self._pool_lock:
+            if self._pool is not None and self._pool[1] is executor:
+                self._pool = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        """Останавливает пул, оставленный keep_pool=True (если он был создан)."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool[1].shutdown(wait=True, cancel_futures=True)
+
+    def _effective_workers(self, n_paths: int) -> int:
+        """
+        Сколько процессов использовать для n_paths файлов (1 = последовательно).
+        """
+        if n_paths < self.parallel_min_files:
+            return 1
+        workers = self.max_workers if self.max_workers is not None else (os.cpu_count() or 1)
+        return max(1, min(workers, n_paths))
+
+    def _parse_file_safe(self, p: str | Path, *, hooks: Sequence[ParserHook] = ()) -> ModuleInfo:
+        """
+        parse_file с последней линией обороны: никогда не падаем всем прогоном из-за одного файла.
+        """
+        try:
+            return self.parse_file(p, hooks=hooks)
+        except Exception as e:
+            path = Path(p).expanduser().resolve()
+            return ModuleInfo(
+                path=path,
+                classes=[],
+                functions=[],
+                imports=[],
+                parse_error=f"UnhandledError: {type(e).__name__}: {e}",
+            )
+
+    def _normalize_path(self, path: str | Path) -> Path:
+        """
+        expanduser + (опционально) resolve — так же, как путь попадёт в ModuleInfo.path.
+        """
+        p = Path(path).expanduser()
+        if self.resolve_paths or not p.is_absolute():
+            p = p.resolve()
+        return p
+
+    # -------------------------------------------------------------------------
+    # In-memory memo
+    # -------------------------------------------------------------------------
+
+    def _memo_key(self, path: Path) -> Optional[tuple[Path, int, int]]:
+        """
+        Ключ memo по stat файла; None, если memo выключен или stat не удался.
+        """
+        if self.memo_max_entries <= 0:
+            return None
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return (path, st.st_mtime_ns, st.st_size)
+
+    def _memo_get(self, key: tuple[Path, int, int]) -> Optional[ModuleInfo]:
+        """
+        Достаёт из memo свежую копию ModuleInfo и помечает запись как недавно использованную.
+        """
+        with self._memo_lock:
+            data = self._memo.pop(key, None)
+            if data is None:
+                return None
+            self._memo[key] = data
+        module: ModuleInfo = pickle.loads(data)
+        return module
+
+    def _memo_put(self, key: tuple[Path, int, int], module: ModuleInfo) -> None:
+        """
+        Кладёт ModuleInfo в memo, вытесняя самые давно использованные записи сверх лимита.
+        """
+        data = pickle.dumps(module, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._memo_lock:
+            self._memo[key] = data
+            while len(self._memo) > self.memo_max_entries:
+                del self._memo[next(iter(self._memo))]
+
+    # -------------------------------------------------------------------------
+    # Disk cache
+    # -------------------------------------------------------------------------
+
+    def _cache_load(self, key: str) -> Optional[ModuleInfo]:
+        """
+        Достаёт ModuleInfo из кэша. Любая проблема (нет файла/битый pickle) -> None.
+        """
+        assert self.cache_dir is not None
+        entry = self.cache_dir / f"{key}.pkl"
+        try:
+            with entry.open("rb") as f:
+                module = pickle.load(f)
+        except Exception:
+            return None
+
+        if not isinstance(module, ModuleInfo):
+            return None
+
+        try:
+            # Обновляем mtime: вытеснение идёт по давности последнего использования.
+            os.utime(entry)
+        except OSError:
+            pass
+        return module
+
+    def _cache_store(self, key: str, module: ModuleInfo) -> None:
+        """
+        Атомарно кладёт ModuleInfo в кэш (tmp + os.replace). Ошибки записи игнорируются.
+        """
+        assert self.cache_dir is not None
+        entry = self.cache_dir / f"{key}.pkl"
+        tmp = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with tmp.open("wb") as f:
+                pickle.dump(module, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, entry)
+        except Exception:
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def _prune_cache(self) -> None:
+        """
+        Ограничивает размер кэша: удаляет самые давно использованные записи сверх лимита.
+        """
+        if self.cache_dir is None or self.cache_max_entries <= 0:
+            return
+
+        try:
+            with os.scandir(self.cache_dir) as it:
+                entries = [e for e in it if e.name.endswith(".pkl")]
+        except OSError:
+            return
+
+        excess = len(entries) - self.cache_max_entries
+        if excess <= 0:
+            return
+
+        def _mtime(e: os.DirEntry[str]) -> float:
+            try:
+                return e.stat().st_mtime
+            except OSError:
+                return 0.0
+
+        entries.sort(key=_mtime)
+        for e in entries[:excess]:
+            try:
+                os.unlink(e.path)
+            except OSError:
+                pass
+
+
+# Парсер процесса-воркера: создаётся лениво, чтобы кэши жили между файлами одного воркера.
+_worker_parser: Optional[CodeParser] = None
+
+
+def _init_worker(cache_dir: Optional[Path], resolve_paths: bool, parse_decorators: bool = True) -> None:
+    """
+    Initializer процесса-воркера: создаёт его парсер с теми же настройками кэша/путей.
+    """
+    global _worker_parser
+    _worker_parser = CodeParser(
+        max_workers=1,
+        cache_dir=cache_dir,
+        resolve_paths=resolve_paths,
+        parse_decorators=parse_decorators,
+    )
+
+
+def _parse_one_in_worker(path: str | Path) -> ModuleInfo:
+    """
+    Точка входа для ProcessPoolExecutor (должна быть module-level, чтобы пиклиться).
+    """
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = CodeParser(max_workers=1)
+    return _worker_parser._parse_file_safe(path)
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
+import heapq
+import json
+import os
+import threading
+from collections import defaultdict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Set, Tuple, Any
+from typing import IO, Dict, FrozenSet, Iterator, List, Optional, Sequence, Set, Tuple
 
-from .models import ProjectModel
+from .models import ClassInfo, ProjectModel
 from .llm_client import LLMClient
 
 
+# Одни и те же базы/типы (`BaseModel`, `Enum`, локальные базы) встречаются у многих классов,
+# а функция чистая: повторный вызов — поиск в словаре вместо разбора строки.
+@functools.lru_cache(maxsize=4096)
 def _short_class_name(raw: str) -> str:
     """
     Возвращает «короткое» имя класса из произвольной строки.
@@ -24,11 +35,9 @@ def _short_class_name(raw: str) -> str:
     name = (raw or "").strip()
     if not name:
         return ""
-    if "[" in name:
-        name = name.split("[", 1)[0]
-    if "." in name:
-        name = name.split(".")[-1]
-    return name
+    # partition/rpartition режут строку одним проходом без списка сегментов,
+    # как делали split("[", 1)[0] / split(".")[-1].
+    return name.partition("[")[0].rpartition(".")[2]
 
 
 def _is_public(name: str) -> bool:
@@ -52,7 +61,7 @@ def _module_to_package_name(path_str: str) -> str:
     return Path(path_str).stem
 
 
-def _class_score(cls: Any) -> int:
+def _class_score(cls: ClassInfo) -> int:
     """
     Грубая эвристика важности класса для ограничения размера диаграммы (top-N).
 
@@ -63,13 +72,115 @@ def _class_score(cls: Any) -> int:
 
     Важно: это *не* строгая метрика, а лишь способ выбрать наиболее заметные классы.
     """
-    return (
-        len(getattr(cls, "methods", [])) * 2
-        + len(getattr(cls, "bases", [])) * 3
-        + len(getattr(cls, "compositions", [])) * 3
+    return len(cls.methods) * 2 + (len(cls.bases) + len(cls.compositions)) * 3
+
+
+def _entry_score(entry: Tuple[str, ClassInfo]) -> int:
+    """
+    Ключ top-N для пар (module_path, ClassInfo): та же формула, что в _class_score,
+    но без второго вызова функции на каждый класс.
+    """
+    cls = entry[1]
+    return len(cls.methods) * 2 + (len(cls.bases) + len(cls.compositions)) * 3
+
+
+# Стрелка связи по CompositionInfo.kind; неизвестный kind рисуется как агрегация.
+_RELATION_ARROWS: Dict[str, str] = {"composition": "*--", "aggregation": "o--"}
+_DEFAULT_RELATION_ARROW = "o--"
+
+
+@dataclass(slots=True)
+class _PreparedDiagram:
+    """
+    Результат общего прохода по ProjectModel: отобранные классы и связи между ними.
+
+    Бэкенды (PlantUML/Mermaid) по нему только форматируют строки.
+    Порядок классов и связей — порядок обнаружения (детерминирован порядком модулей/классов/баз).
+
+    classes: пары (str(module.path), ClassInfo) отобранных классов. Методы не копируются
+    в отдельные списки заранее: бэкенд фильтрует их (_method_names) прямо при выводе,
+    так обход методов остаётся один.
+    """
+
+    classes: List[Tuple[str, ClassInfo]]
+    public_only: bool
+    inheritance: List[Tuple[str, str]]  # (child, parent)
+    relations: List[Tuple[str, str, str, str]]  # (owner, arrow, target, label)
+
+
+def _prepare_diagram_model(
+    project: ProjectModel,
+    *,
+    public_only: bool,
+    show_relations: bool,
+    max_classes: int,
+) -> _PreparedDiagram:
+    """
+    Общее ядро обоих генераторов: отбор классов (top-N) и сбор связей между ними.
+
+    - если max_classes > 0, берутся top-N классов по _class_score;
+    - связи (inheritance/composition) собираются только между *выбранными* классами
+      и только при show_relations.
+    """
+    # --- collect classes ---
+    all_classes: List[Tuple[str, ClassInfo]] = []
+    for module in project.modules:
+        if module.classes:
+            path_str = str(module.path)
+            for cls in module.classes:
+                all_classes.append((path_str, cls))
+
+    # --- sort & cut top-N ---
+    if max_classes and max_classes > 0:
+        # nlargest: O(N log K) вместо полной сортировки; при равных score порядок
+        # исходный — как у стабильного sort(reverse=True)[:K].
+        all_classes = heapq.nlargest(max_classes, all_classes, key=_entry_score)
+
+    if not show_relations:
+        return _PreparedDiagram(classes=all_classes, public_only=public_only, inheritance=[], relations=[])
+
+    selected_class_names: FrozenSet[str] = frozenset(cls.name for _, cls in all_classes)
+    # Хелперы вызываются на каждую базу/связь: связываем с локальными именами.
+    short_name = _short_class_name
+    arrow_for = _RELATION_ARROWS.get
+
+    # --- inheritance (child --|> parent) и composition / aggregation ---
+    # Один проход по классам заполняет оба словаря.
+    # dict вместо set: дедупликация с сохранением порядка обнаружения, сортировка не нужна.
+    inheritance: Dict[Tuple[str, str], None] = {}
+    relations: Dict[Tuple[str, str, str, str], None] = {}
+    for _, cls in all_classes:
+        cname = cls.name
+        for base in cls.bases:
+            parent = short_name(base)
+            # показываем только связи между классами, которые попали в текущую диаграмму
+            if parent and parent != "object" and parent in selected_class_names:
+                inheritance[(cname, parent)] = None
+
+        for rel in cls.compositions:
+            a = rel.owner or cname
+            b = short_name(rel.target)
+            if a in selected_class_names and b in selected_class_names:
+                relations[(a, arrow_for(rel.kind, _DEFAULT_RELATION_ARROW), b, rel.attribute or "")] = None
+
+    return _PreparedDiagram(
+        classes=all_classes,
+        public_only=public_only,
+        inheritance=list(inheritance),
+        relations=list(relations),
     )
 
 
+def _method_names(cls: ClassInfo, public_only: bool) -> List[str]:
+    """
+    Имена методов класса для диаграммы (с учётом public_only).
+    """
+    if public_only:
+        # Инлайн _is_public: без вызова функции на каждый метод.
+        return [m.name for m in cls.methods if m.name and not m.name.startswith("_")]
+    return [m.name for m in cls.methods]
+
+
 @dataclass
 class DiagramGenerator:
     """
@@ -81,6 +192,11 @@ class DiagramGenerator:
     - show_relations: добавлять наследование и композиции/агрегации;
     - max_classes: ограничить размер диаграммы (top-N по эвристике важности).
       Значение 0 означает «без ограничений».
+
+    Результат намеренно не мемоизируется: отпечаток ProjectModel (обход всех
+    модулей/классов/связей) стоит столько же, сколько сам рендер. Повторные
+    вызовы с неизменённым проектом дешевле закрывать кэшами уровнем выше
+    (CodeParser, кэш ответов LLM в DiagramAI).
     """
 
     public_only: bool = True
@@ -105,99 +221,215 @@ class DiagramGenerator:
         - если включён max_classes > 0, отбирает top-N наиболее «важных» классов;
         - связи (inheritance/composition) рисуются только между *выбранными* классами.
         """
+        return "\n".join(
+            self._iter_lines(
+                project,
+                public_only=public_only,
+                group_by_module=group_by_module,
+                show_relations=show_relations,
+                max_classes=max_classes,
+            )
+        )
+
+    def generate_class_diagram_to(
+        self,
+        project: ProjectModel,
+        out: IO[str],
+        *,
+        public_only: Optional[bool] = None,
+        group_by_module: Optional[bool] = None,
+        show_relations: Optional[bool] = None,
+        max_classes: Optional[int] = None,
+    ) -> None:
+        """
+        То же, что generate_class_diagram, но пишет диаграмму построчно в `out`
+        (файл/поток), не собирая её целиком в одну строку.
+
+        Записанный текст совпадает с результатом generate_class_diagram байт в байт.
+        """
+        write = out.write
+        lines = self._iter_lines(
+            project,
+            public_only=public_only,
+            group_by_module=group_by_module,
+            show_relations=show_relations,
+            max_classes=max_classes,
+        )
+        # Первая строка — всегда "@startuml"; остальные пишем с разделителем впереди,
+        # чтобы, как у join, не было завершающего перевода строки.
+        write(next(lines))
+        for line in lines:
+            write("\n")
+            write(line)
+
+    def _iter_lines(
+        self,
+        project: ProjectModel,
+        *,
+        public_only: Optional[bool],
+        group_by_module: Optional[bool],
+        show_relations: Optional[bool],
+        max_classes: Optional[int],
+    ) -> Iterator[str]:
+        """
+        Форматирует PlantUML поверх общего прохода (_prepare_diagram_model); возвращает итератор строк.
+        """
         public_only = self.public_only if public_only is None else public_only
         group_by_module = self.group_by_module if group_by_module is None else group_by_module
         show_relations = self.show_relations if show_relations is None else show_relations
         max_classes = self.max_classes if max_classes is None else max_classes
 
-        lines: List[str] = ["@startuml", ""]
+        prepared = _prepare_diagram_model(
+            project,
+            public_only=public_only,
+            show_relations=show_relations,
+            max_classes=max_classes,
+        )
+        return _emit_plantuml(prepared, group_by_module=group_by_module, show_relations=show_relations)
+
+
+def render_all(
+    project: ProjectModel,
+    *,
+    backends: Sequence[str] = ("plantuml", "mermaid"),
+    public_only: bool = True,
+    group_by_module: bool = False,
+    show_relations: bool = True,
+    max_classes: int = 0,
+) -> Dict[str, str]:
+    """
+    Рендерит диаграмму сразу в несколько форматов за один проход по проекту.
 
-        # --- collect classes ---
-        all_classes: List[Tuple[Any, Any]] = []
-        for module in project.modules:
-            for cls in module.classes:
-                all_classes.append((module, cls))
-
-        # --- sort & cut top-N ---
-        if max_classes and max_classes > 0:
-            all_classes.sort(key=lambda mc: _class_score(mc[1]), reverse=True)
-            all_classes = all_classes[:max_classes]
-
-        selected_class_names: Set[str] = {cls.name for _, cls in all_classes}
-
-        def render_class(cls: Any) -> None:
-            """
-            Рендерит один class-блок PlantUML (с методами, отфильтрованными по public_only).
-            """
-            lines.append(f"class {cls.name} {{")
-            for method in getattr(cls, "methods", []):
-                if public_only and not _is_public(method.name):
-                    continue
-                # Сохраняем прежний формат: "+ methodName()"
-                lines.append(f"    + {method.name}()")
-            lines.append("}")
-            lines.append("")
-
-        # --- render classes ---
-        if group_by_module:
-            by_module: dict[str, List[Any]] = {}
-            for module, cls in all_classes:
-                by_module.setdefault(str(module.path), []).append(cls)
-
-            for module_path, classes in by_module.items():
-                pkg = _module_to_package_name(module_path)
-                lines.append(f'package "{pkg}" {{')
-                for cls in classes:
-                    render_class(cls)
-                lines.append("}")
-                lines.append("")
+    Отбор классов (top-N) и сбор связей (_prepare_diagram_model) выполняются один раз,
+    бэкенды только форматируют строки. Результат каждого формата совпадает с
+    DiagramGenerator / MermaidDiagramGenerator при тех же опциях.
+
+    Возвращает {backend: текст} в порядке `backends`; group_by_module влияет только на PlantUML.
+    """
+    unknown = [b for b in backends if b not in ("plantuml", "mermaid")]
+    if unknown:
+        raise ValueError(f"Unknown diagram backend(s): {', '.join(unknown)}; expected 'plantuml' or 'mermaid'")
+
+    prepared = _prepare_diagram_model(
+        project,
+        public_only=public_only,
+        show_relations=show_relations,
+        max_classes=max_classes,
+    )
+
+    rendered: Dict[str, str] = {}
+    for backend in backends:
+        if backend == "plantuml":
+            lines = _emit_plantuml(prepared, group_by_module=group_by_module, show_relations=show_relations)
         else:
-            for _, cls in all_classes:
-                render_class(cls)
-
-        if not show_relations:
-            lines.append("@enduml")
-            return "\n".join(lines)
-
-        # --- inheritance (child --|> parent) ---
-        inheritance: Set[Tuple[str, str]] = set()
-        for _, cls in all_classes:
-            for base in getattr(cls, "bases", []):
-                parent = _short_class_name(base)
-                if not parent or parent == "object":
-                    continue
-                # показываем только связи между классами, которые попали в текущую диаграмму
-                if parent not in selected_class_names:
-                    continue
-                inheritance.add((cls.name, parent))
-
-        for child, parent in sorted(inheritance):
-            lines.append(f"{child} --|> {parent}")
-
-        # --- composition / aggregation ---
-        # tuple: (owner, arrow, target, label)
-        relations: Set[Tuple[str, str, str, str]] = set()
-        for _, cls in all_classes:
-            for rel in getattr(cls, "compositions", []):
-                a = rel.owner or cls.name
-                b = _short_class_name(rel.target)
-                if a not in selected_class_names or b not in selected_class_names:
-                    continue
+            # Ленивый импорт: модуль Mermaid сам импортирует этот модуль.
+            from .diagram_generator_mermaid import _emit_mermaid
 
-                kind = getattr(rel, "kind", "composition")
-                arrow = "*--" if kind == "composition" else "o--"
-                label = rel.attribute or ""
-                relations.add((a, arrow, b, label))
+            lines = _emit_mermaid(prepared, show_relations=show_relations)
+        rendered[backend] = "\n".join(lines)
+    return rendered
 
-        for a, arrow, b, label in sorted(relations):
-            if label:
-                lines.append(f'{a} {arrow} {b} : "{label}"')
-            else:
-                lines.append(f"{a} {arrow} {b}")
 
-        lines.append("")
-        lines.append("@enduml")
-        return "\n".join(lines)
+def _emit_plantuml(prepared: _PreparedDiagram, *, group_by_module: bool, show_relations: bool) -> Iterator[str]:
+    """
+    Генерирует строки PlantUML-диаграммы по порядку, без промежуточного списка строк.
+    """
+
+    public_only = prepared.public_only
+
+    def render_class(cls: ClassInfo) -> str:
+        """
+        Рендерит один class-блок PlantUML (с методами, отфильтрованными по public_only)
+        одной строкой: методы склеиваются str.join, а не выдаются построчно.
+
+        Блок заканчивается "}\n": вместе с разделителем строк это даёт прежнюю
+        пустую строку после класса.
+        """
+        # Сохраняем прежний формат: "+ methodName()"
+        methods = "".join([f"\n    + {name}()" for name in _method_names(cls, public_only)])
+        return f"class {cls.name} {{{methods}\n}}\n"
+
+    yield "@startuml"
+    yield ""
+
+    # --- render classes ---
+    if group_by_module:
+        # str(module.path) уже посчитан один раз на модуль в _prepare_diagram_model.
+        by_module: defaultdict[str, List[ClassInfo]] = defaultdict(list)
+        for module_path, cls in prepared.classes:
+            by_module[module_path].append(cls)
+
+        for module_path, classes in by_module.items():
+            pkg = _module_to_package_name(module_path)
+            yield f'package "{pkg}" {{'
+            for cls in classes:
+                yield render_class(cls)
+            yield "}"
+            yield ""
+    else:
+        for _, cls in prepared.classes:
+            yield render_class(cls)
+
+    if not show_relations:
+        yield "@enduml"
+        return
+
+    for child, parent in prepared.inheritance:
+        yield f"{child} --|> {parent}"
+
+    for a, arrow, b, label in prepared.relations:
+        if label:
+            yield f'{a} {arrow} {b} : "{label}"'
+        else:
+            yield f"{a} {arrow} {b}"
+
+    yield ""
+    yield "@enduml"
+
+
+class _LLMDiagramCache:
+    """
+    Дисковый кэш проверенных ответов LLM для DiagramAI.
+
+    Ключ — хэш промпта (в него входит baseline-диаграмма) + модель/эндпоинт клиента:
+    при неизменённом проекте повторный запрос в LLM не делается.
+    Одна запись — один файл `<key>.puml`; запись атомарная (tmp + os.replace).
+    Ошибки ввода-вывода не пробрасываются: кэш — только ускорение.
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = Path(cache_dir).expanduser()
+
+    @staticmethod
+    def make_key(prompt: str, model_tag: str) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(model_tag.encode("utf-8", errors="surrogatepass"))
+        h.update(b"\0")
+        h.update(prompt.encode("utf-8", errors="surrogatepass"))
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            text = (self.cache_dir / f"{key}.puml").read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+        # Повреждённую/обрезанную запись считаем промахом.
+        if "@startuml" in text and "@enduml" in text:
+            return text
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        target = self.cache_dir / f"{key}.puml"
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, target)
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
 
 
 class DiagramAI:
@@ -215,9 +447,29 @@ class DiagramAI:
         self,
         generator: DiagramGenerator | None = None,
         client: LLMClient | None = None,
+        cache_dir: Path | None = None,
+        stream: bool = False,
+        memory_cache_size: int = 64,
     ) -> None:
+        """
+        cache_dir:
+          директория дискового кэша ответов LLM (см. _LLMDiagramCache). None -> кэш выключен.
+        memory_cache_size:
+          размер in-memory LRU проверенных ответов LLM (тот же ключ, что у дискового кэша):
+          повторный запрос в рамках жизни объекта не трогает ни сеть, ни диск. 0 -> выключен.
+        stream:
+          читать ответ LLM потоком (client.chat_stream) и прерывать его, как только получен
+          `@enduml` или стало ясно, что диаграммы не будет (см. _improve_streaming).
+        """
         self._generator = generator or DiagramGenerator()
         self._client = client or LLMClient()
+        self._cache = _LLMDiagramCache(cache_dir) if cache_dir is not None else None
+        self._stream = stream
+        self._memory_cache_size = memory_cache_size
+        # key -> диаграмма; порядок вставки = порядок использования.
+        self._memory_cache: Dict[str, str] = {}
+        # DiagramAI может вызываться из нескольких потоков (threadpool сервиса, generate_many).
+        self._memory_cache_lock = threading.Lock()
 
     def generate_with_llm(self, project: ProjectModel) -> str:
         """
@@ -229,51 +481,349 @@ class DiagramAI:
         3) Иначе отправляем baseline как вход и просим улучшить (с фильтрацией мусора/группировкой).
         4) Возвращаем ответ LLM только если он содержит валидный блок PlantUML.
         5) При любых проблемах возвращаем baseline.
+
+        Если задан cache_dir, валидный ответ LLM сохраняется по хэшу промпта и модели;
+        для того же baseline повторный вызов возвращает его без запроса в LLM.
         """
         static_diagram = self._generator.generate_class_diagram(project)
 
         if not self._client.is_enabled():
             return static_diagram
 
-        prompt = (
-            "Ты — помощник по анализу архитектуры Python-проектов.\n\n"
-            "Ниже дана PlantUML-диаграмма классов, сгенерированная статическим анализом AST.\n"
-            "Твоя задача — сделать её более аккуратной и обзорной:\n\n"
-            "1. Удали второстепенные или технические классы (tests, utils, internal и т.п.), если они не критичны для архитектуры.\n"
-            "2. Сгруппируй классы по смысловым подсистемам через package, если это уместно.\n"
-            "3. Сохрани только самые важные связи наследования и композиции.\n"
-            "4. СТРОГО сохрани синтаксис PlantUML.\n\n"
-            "Важные требования:\n"
-            "- Не добавляй никакого текста/комментариев вне блока диаграммы.\n"
-            "- Обязательно оставь строки @startuml и @enduml.\n"
-            "- Выведи только итоговый PlantUML, без пояснений.\n\n"
-            "Вот исходная диаграмма:\n"
-            "```plantuml\n"
-            f"{static_diagram}\n"
-            "```\n"
-        ).strip()
+        return self._improve(static_diagram)
+
+    def generate_with_llm_batch(
+        self,
+        projects: Sequence[ProjectModel],
+        *,
+        max_prompt_chars: int = 60_000,
+    ) -> List[str]:
+        """
+        То же, что generate_with_llm, но для нескольких проектов сразу: baseline-диаграммы
+        упаковываются в один промпт (JSON-массив `{id, puml}`), и LLM отвечает таким же массивом.
+        Вместо N запросов — столько, сколько пачек, ограниченных max_prompt_chars.
+
+        Гарантии те же, что у generate_with_llm, но по каждому проекту отдельно:
+        - результат всегда той же длины и в том же порядке, что projects;
+        - для проекта без валидного ответа (ошибка/нет записи/битый PlantUML) — его baseline;
+        - попадания в кэш ответов LLM в запрос не идут; валидные ответы кладутся в кэш
+          под тем же ключом, что и при одиночном вызове.
+        - диаграмма, которая одна не помещается в лимит, уходит одиночным запросом.
+        """
+        results = [self._generator.generate_class_diagram(project) for project in projects]
+
+        if not self._client.is_enabled():
+            return results
+
+        pending: List[int] = []
+        for i, static_diagram in enumerate(results):
+            cached = self._cache_get(self._build_prompt(static_diagram))
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append(i)
+
+        # Пачки по суммарному размеру диаграмм (порядок сохраняем).
+        batches: List[List[int]] = []
+        current: List[int] = []
+        size = 0
+        for i in pending:
+            n = len(results[i])
+            if current and size + n > max_prompt_chars:
+                batches.append(current)
+                current, size = [], 0
+            current.append(i)
+            size += n
+        if current:
+            batches.append(current)
+
+        for batch in batches:
+            if len(batch) == 1:
+                results[batch[0]] = self._improve(results[batch[0]])
+                continue
+
+            items = [{"id": i, "puml": results[i]} for i in batch]
+            try:
+                answer = self._client.chat(_BATCH_PROMPT_HEADER + json.dumps(items, ensure_ascii=False))
+                parsed = json.loads(_strip_code_fence((answer or "").strip(), {"json"}))
+            except Exception:
+                continue
+            if not isinstance(parsed, list):
+                continue
+
+            expected = set(batch)
+            for entry in parsed:
+                if not isinstance(entry, dict):
+                    continue
+                entry_id = entry.get("id")
+                puml = entry.get("puml")
+                # Строго int: список/словарь в id не хешируется (TypeError), а True == 1.
+                if type(entry_id) is not int or entry_id not in expected or not isinstance(puml, str):
+                    continue
+                text = _extract_plantuml(puml)
+                if text is None:
+                    continue
+                expected.discard(entry_id)
+                self._cache_put(self._build_prompt(results[entry_id]), text)
+                results[entry_id] = text
+
+        return results
+
+    async def generate_with_llm_async(self, project: ProjectModel) -> str:
+        """
+        Асинхронный вариант generate_with_llm с тем же поведением и fallback'ами.
+
+        Если у клиента есть `chat_async`, используется он; иначе синхронный `chat`
+        выполняется в отдельном потоке (asyncio.to_thread), не блокируя event loop.
+        """
+        static_diagram = self._generator.generate_class_diagram(project)
+
+        if not self._client.is_enabled():
+            return static_diagram
+
+        prompt = self._build_prompt(static_diagram)
+
+        cached = self._cache_get(prompt)
+        if cached is not None:
+            return cached
+
+        try:
+            chat_async = getattr(self._client, "chat_async", None)
+            if chat_async is not None:
+                result = await chat_async(prompt)
+            else:
+                result = await asyncio.to_thread(self._client.chat, prompt)
+        except Exception:
+            return static_diagram
+
+        text = _extract_plantuml(result)
+        if text is None:
+            return static_diagram
+
+        self._cache_put(prompt, text)
+        return text
+
+    async def generate_many(self, projects: Sequence[ProjectModel], *, max_concurrency: int = 8) -> List[str]:
+        """
+        Параллельные независимые запросы для нескольких проектов (не более max_concurrency
+        одновременно). Порядок результатов совпадает с projects; у каждого проекта свой fallback.
+
+        Полезно, когда пакетный режим (generate_with_llm_batch) не подходит, например
+        из-за лимита контекста модели.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def bounded(project: ProjectModel) -> str:
+            async with semaphore:
+                return await self.generate_with_llm_async(project)
+
+        return list(await asyncio.gather(*(bounded(project) for project in projects)))
+
+    def _improve(self, static_diagram: str) -> str:
+        """
+        Один запрос в LLM (с кэшем) для готовой baseline-диаграммы; при любой проблеме — baseline.
+        """
+        prompt = self._build_prompt(static_diagram)
+
+        cached = self._cache_get(prompt)
+        if cached is not None:
+            return cached
+
+        if self._stream and hasattr(self._client, "chat_stream"):
+            return self._improve_streaming(prompt, static_diagram)
 
         try:
             result = self._client.chat(prompt)
         except Exception:
             return static_diagram
 
-        text = (result or "").strip()
-
-        # Модель часто оборачивает ответ в fenced code block: ```plantuml ... ```
-        if "```" in text:
-            parts = text.split("```")
-            if len(parts) >= 3:
-                candidate = parts[1]
-                # иногда первым идёт язык блока: "plantuml\n..."
-                if "\n" in candidate:
-                    first_line, rest = candidate.split("\n", 1)
-                    if first_line.strip().lower() in {"plantuml", "puml"}:
-                        candidate = rest
-                text = candidate.strip()
-
-        # Минимальная валидация: должны быть маркеры начала/конца диаграммы
-        if "@startuml" in text and "@enduml" in text:
-            return text
+        text = _extract_plantuml(result)
+        if text is None:
+            return static_diagram
+
+        self._cache_put(prompt, text)
+        return text
 
+    def _improve_streaming(self, prompt: str, static_diagram: str) -> str:
+        """
+        Потоковое чтение ответа с ранним выходом:
+        - как только после `@startuml` пришёл `@enduml`, поток закрывается и возвращается
+          диаграмма (текст от `@startuml` до `@enduml` включительно);
+        - если `@startuml` нет в первых _STREAM_START_LIMIT символах или ответ открылся
+          fenced-блоком не с PlantUML — поток закрывается, возвращается baseline.
+        """
+        chunks = self._client.chat_stream(prompt)
+        text = ""
+        start = -1
+        try:
+            for chunk in chunks:
+                # Ищем маркеры только в новом хвосте (с запасом на маркер, разрезанный между чанками).
+                scan_from = max(0, len(text) - len(_END_MARKER))
+                text += chunk
+
+                if start < 0:
+                    start = text.find(_START_MARKER, max(0, scan_from - len(_START_MARKER)))
+                    if start < 0:
+                        if len(text) > _STREAM_START_LIMIT or _opens_foreign_fence(text):
+                            return static_diagram
+                        continue
+                    scan_from = start
+
+                end = text.find(_END_MARKER, scan_from)
+                if end >= 0:
+                    diagram = text[start : end + len(_END_MARKER)]
+                    self._cache_put(prompt, diagram)
+                    return diagram
+        except Exception:
+            return static_diagram
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+        # Поток закончился без `@enduml`.
         return static_diagram
+
+    @staticmethod
+    def _build_prompt(static_diagram: str) -> str:
+        """
+        Промпт «улучши диаграмму» для одной baseline-диаграммы.
+        """
+        return _PROMPT_HEAD + static_diagram + _PROMPT_TAIL
+
+    def _cache_key(self, prompt: str) -> str:
+        model_tag = f"{getattr(self._client, 'api_base', '')}|{getattr(self._client, 'model', '')}"
+        return _LLMDiagramCache.make_key(prompt, model_tag)
+
+    def _cache_get(self, prompt: str) -> Optional[str]:
+        """
+        Ищет проверенный ответ сначала в памяти, затем на диске (дисковое попадание поднимается в память).
+        """
+        if self._cache is None and self._memory_cache_size <= 0:
+            return None
+
+        key = self._cache_key(prompt)
+        with self._memory_cache_lock:
+            text = self._memory_cache.pop(key, None)
+            if text is not None:
+                self._memory_cache[key] = text
+                return text
+
+        if self._cache is None:
+            return None
+        text = self._cache.get(key)
+        if text is not None:
+            self._memory_put(key, text)
+        return text
+
+    def _cache_put(self, prompt: str, text: str) -> None:
+        if self._cache is None and self._memory_cache_size <= 0:
+            return
+
+        key = self._cache_key(prompt)
+        self._memory_put(key, text)
+        if self._cache is not None:
+            self._cache.put(key, text)
+
+    def _memory_put(self, key: str, text: str) -> None:
+        """
+        Кладёт ответ в in-memory LRU, вытесняя самые давно использованные записи сверх лимита.
+        """
+        if self._memory_cache_size <= 0:
+            return
+        with self._memory_cache_lock:
+            self._memory_cache[key] = text
+            while len(self._memory_cache) > self._memory_cache_size:
+                del self._memory_cache[next(iter(self._memory_cache))]
+
+
+# Промпт «улучши диаграмму» (_build_prompt). Текст не менять без нужды: от него зависят ключи
+# кэша LLM-ответов (_LLMDiagramCache), и любая правка инвалидирует уже сохранённые ответы.
+_PROMPT_TEMPLATE = (
+    "Ты — помощник по анализу архитектуры Python-проектов.\n\n"
+    "Ниже дана PlantUML-диаграмма классов, сгенерированная статическим анализом AST.\n"
+    "Твоя задача — сделать её более аккуратной и обзорной:\n\n"
+    "1. Удали второстепенные или технические классы (tests, utils, internal и т.п.), если они не критичны для архитектуры.\n"
+    "2. Сгруппируй классы по смысловым подсистемам через package, если это уместно.\n"
+    "3. Сохрани только самые важные связи наследования и композиции.\n"
+    "4. СТРОГО сохрани синтаксис PlantUML.\n\n"
+    "Важные требования:\n"
+    "- Не добавляй никакого текста/комментариев вне блока диаграммы.\n"
+    "- Обязательно оставь строки @startuml и @enduml.\n"
+    "- Выведи только итоговый PlantUML, без пояснений.\n\n"
+    "Вот исходная диаграмма:\n"
+    "```plantuml\n"
+    "{diagram}\n"
+    "```"
+)
+# Шаблон режется по плейсхолдеру один раз при импорте: склейка трёх строк заметно дешевле,
+# чем str.format, который на каждый вызов заново разбирает длинный (не-ASCII) шаблон.
+_PROMPT_HEAD, _PROMPT_TAIL = _PROMPT_TEMPLATE.split("{diagram}")
+
+# Промпт пакетного режима (generate_with_llm_batch); после него идёт JSON-массив диаграмм.
+_BATCH_PROMPT_HEADER = (
+    "Ты — помощник по анализу архитектуры Python-проектов.\n\n"
+    "Ниже дан JSON-массив объектов {\"id\": ..., \"puml\": ...}: PlantUML-диаграммы классов "
+    "нескольких проектов, сгенерированные статическим анализом AST.\n"
+    "Для КАЖДОЙ диаграммы независимо:\n\n"
+    "1. Удали второстепенные или технические классы (tests, utils, internal и т.п.), если они не критичны для архитектуры.\n"
+    "2. Сгруппируй классы по смысловым подсистемам через package, если это уместно.\n"
+    "3. Сохрани только самые важные связи наследования и композиции.\n"
+    "4. СТРОГО сохрани синтаксис PlantUML.\n\n"
+    "Важные требования:\n"
+    "- Ответ — только JSON-массив той же формы: [{\"id\": <тот же id>, \"puml\": <итоговый PlantUML>}].\n"
+    "- В каждом puml обязательно оставь строки @startuml и @enduml.\n"
+    "- Никакого текста вне JSON.\n\n"
+    "Диаграммы:\n"
+)
+
+
+_START_MARKER = "@startuml"
+_END_MARKER = "@enduml"
+# Сколько символов потокового ответа ждём `@startuml`, прежде чем счесть ответ прозой.
+_STREAM_START_LIMIT = 2000
+_PLANTUML_FENCE_LANGUAGES = frozenset({"", "plantuml", "puml", "uml"})
+
+
+def _opens_foreign_fence(text: str) -> bool:
+    """
+    True, если ответ начинается fenced-блоком с языком, отличным от PlantUML (например ```python).
+    """
+    text = text.lstrip()
+    if not text.startswith("```"):
+        return False
+    first_line, sep, _ = text[3:].partition("\n")
+    # Язык известен, только когда строка открытия блока пришла целиком.
+    return bool(sep) and first_line.strip().lower() not in _PLANTUML_FENCE_LANGUAGES
+
+
+def _strip_code_fence(text: str, languages: Set[str]) -> str:
+    """
+    Достаёт содержимое первого fenced code block (```lang ... ```), если он есть.
+
+    Строка языка отбрасывается, только если она из `languages`; без блока текст возвращается как есть.
+    """
+    if "```" in text:
+        parts = text.split("```")
+        if len(parts) >= 3:
+            candidate = parts[1]
+            # иногда первым идёт язык блока: "plantuml\n..."
+            if "\n" in candidate:
+                first_line, rest = candidate.split("\n", 1)
+                if first_line.strip().lower() in languages:
+                    candidate = rest
+            text = candidate.strip()
+    return text
+
+
+def _extract_plantuml(result: Optional[str]) -> Optional[str]:
+    """
+    Вытаскивает PlantUML из ответа LLM; None, если ответ не похож на диаграмму.
+    """
+    # Модель часто оборачивает ответ в fenced code block: ```plantuml ... ```
+    text = _strip_code_fence((result or "").strip(), {"plantuml", "puml"})
+
+    # Минимальная валидация: должны быть маркеры начала/конца диаграммы
+    if "@startuml" in text and "@enduml" in text:
+        return text
+    return None
@@ -1,55 +1,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional, Set, Tuple, Any
+from typing import Iterator, Optional
 
+from .diagram_generator import _method_names, _prepare_diagram_model, _PreparedDiagram
 from .models import ProjectModel
 
 
-def _short_class_name(raw: str) -> str:
-    """
-    Нормализует имя типа/класса до короткого имени для диаграммы.
-
-    Зачем:
-    - базы/типы могут приходить как fully-qualified: `pkg.mod.Class`
-    - могут содержать generics: `Class[T]`
-
-    Правила:
-    - пустая строка -> пустая строка
-    - отрезаем всё после `[` (generic)
-    - берём последний сегмент после `.`
-    """
-    name = (raw or "").strip()
-    if not name:
-        return ""
-    if "[" in name:
-        name = name.split("[", 1)[0]
-    if "." in name:
-        name = name.split(".")[-1]
-    return name
-
-
-def _is_public(name: str) -> bool:
-    """
-    Признак публичного метода по python-стилю именования: не начинается с `_`.
-    """
-    return bool(name) and not name.startswith("_")
-
-
-def _class_score(cls: Any) -> int:
-    """
-    Эвристика "важности" класса для top-N ограничения диаграммы.
-
-    Используется только когда `max_classes > 0`.
-    Чем выше score, тем выше шанс попасть в итоговую диаграмму.
-    """
-    return (
-        len(getattr(cls, "methods", [])) * 2
-        + len(getattr(cls, "bases", [])) * 3
-        + len(getattr(cls, "compositions", [])) * 3
-    )
-
-
 @dataclass
 class MermaidDiagramGenerator:
     """
@@ -98,64 +55,41 @@ class MermaidDiagramGenerator:
         max_classes = self.max_classes if max_classes is None else max_classes
         _ = self.group_by_module if group_by_module is None else group_by_module  # намеренно игнорируем
 
-        lines: List[str] = ["classDiagram"]
-
-        # --- collect classes from all modules ---
-        all_classes: List[Any] = []
-        for module in project.modules:
-            all_classes.extend(module.classes)
-
-        # --- apply top-N limit if requested ---
-        if max_classes and max_classes > 0:
-            all_classes.sort(key=_class_score, reverse=True)
-            all_classes = all_classes[:max_classes]
-
-        class_names: Set[str] = {cls.name for cls in all_classes}
-
-        # --- render class stubs and methods ---
-        for cls in all_classes:
-            lines.append(f"class {cls.name}")
-            for method in getattr(cls, "methods", []):
-                if public_only and not _is_public(method.name):
-                    continue
-                # Mermaid method notation: `Class : +method()`
-                lines.append(f"{cls.name} : +{method.name}()")
-
-        if not show_relations:
-            return "\n".join(lines)
-
-        # --- inheritance ---
-        # Mermaid syntax: Parent <|-- Child
-        inheritance: Set[Tuple[str, str]] = set()
-        for cls in all_classes:
-            for base in getattr(cls, "bases", []):
-                parent = _short_class_name(base)
-                if not parent or parent == "object":
-                    continue
-                if parent in class_names:
-                    inheritance.add((cls.name, parent))
-
-        for child, parent in sorted(inheritance):
-            lines.append(f"{parent} <|-- {child}")
-
-        # --- composition / aggregation ---
-        relations: Set[Tuple[str, str, str, str]] = set()
-        for cls in all_classes:
-            for rel in getattr(cls, "compositions", []):
-                a = rel.owner or cls.name
-                b = _short_class_name(rel.target)
-                if a not in class_names or b not in class_names:
-                    continue
-
-                kind = getattr(rel, "kind", "composition")
-                arrow = "*--" if kind == "composition" else "o--"
-                label = rel.attribute or ""
-                relations.add((a, arrow, b, label))
-
-        for a, arrow, b, label in sorted(relations):
-            if label:
-                lines.append(f"{a} {arrow} {b} : {label}")
-            else:
-                lines.append(f"{a} {arrow} {b}")
-
-        return "\n".join(lines)
+        prepared = _prepare_diagram_model(
+            project,
+            public_only=public_only,
+            show_relations=show_relations,
+            max_classes=max_classes,
+        )
+        return "\n".join(_emit_mermaid(prepared, show_relations=show_relations))
+
+
+def _emit_mermaid(prepared: _PreparedDiagram, *, show_relations: bool) -> Iterator[str]:
+    """
+    Генерирует строки Mermaid classDiagram по порядку, без промежуточного списка строк.
+    """
+    yield "classDiagram"
+
+    # --- render class stubs and methods ---
+    public_only = prepared.public_only
+    for _, cls in prepared.classes:
+        cls_name = cls.name
+        yield f"class {cls_name}"
+        for name in _method_names(cls, public_only):
+            # Mermaid method notation: `Class : +method()`
+            yield f"{cls_name} : +{name}()"
+
+    if not show_relations:
+        return
+
+    # --- inheritance ---
+    # Mermaid syntax: Parent <|-- Child
+    for child, parent in prepared.inheritance:
+        yield f"{parent} <|-- {child}"
+
+    # --- composition / aggregation ---
+    for a, arrow, b, label in prepared.relations:
+        if label:
+            yield f"{a} {arrow} {b} : {label}"
+        else:
+            yield f"{a} {arrow} {b}"
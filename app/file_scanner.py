@@ -1,10 +1,20 @@
 from __future__ import annotations
 
+import fnmatch
+import functools
+import hashlib
+import operator
 import os
+import pickle
+import re
+import shutil
+import stat
+import subprocess
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from fnmatch import fnmatch
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
 
 
 # =============================================================================
@@ -20,6 +30,10 @@ DEFAULT_SKIP_DIRS: Set[str] = {
     "node_modules",
     ".idea",
     ".mypy_cache",
+    # Кэш pytest и окружения tox/nox: внутри только служебные файлы и чужие site-packages.
+    ".pytest_cache",
+    ".tox",
+    ".nox",
 }
 
 DEFAULT_BINARY_EXTENSIONS: Set[str] = {
@@ -49,6 +63,24 @@ DEPENDENCY_FILENAMES: Tuple[str, ...] = (
     "pyproject.toml",
     "setup.cfg",
 )
+# То же множеством: проверка имени на каждом файле обхода — хеш-поиск, а не проход по кортежу.
+_DEPENDENCY_FILENAME_SET: FrozenSet[str] = frozenset(DEPENDENCY_FILENAMES)
+
+
+# Сколько ждём `git ls-files` (FileScannerConfig.use_git), прежде чем откатиться на обычный обход.
+_GIT_LS_FILES_TIMEOUT_SEC = 60
+
+# Абсолютный путь к git: shutil.which обходит весь PATH, ищем один раз на процесс (_git_executable).
+_GIT_PATH: Optional[str] = None
+
+# Версия формата дискового кэша скана (FileScannerConfig.cache_dir); меняется вместе с логикой scan().
+_SCAN_CACHE_VERSION = "1"
+# Запись кэша не сохраняется, если что-то из проверяемого менялось за это время до начала скана:
+# изменение в тот же «тик» часов ФС (грубые mtime, 2 с на FAT) после записи было бы не видно.
+_SCAN_CACHE_RACY_NS = 2 * 10**9
+
+# Сколько скомпилированных .gitignore держать в памяти процесса (_load_gitignore).
+_GITIGNORE_CACHE_SIZE = 4096
 
 
 # =============================================================================
@@ -119,6 +151,18 @@ class FileScannerConfig:
     respect_gitignore: bool = True
     # Рекомендуется True: предотвращает циклы и неожиданные обходы.
     skip_symlinks: bool = True
+    # Потоки для чтения директорий наперёд (1 -> без пула). Помогает на холодном кэше
+    # и сетевых ФС; на тёплом локальном дереве пул только добавляет накладные расходы.
+    max_workers: int = 1
+    # Брать список файлов из `git ls-files -co --exclude-standard`, если root внутри git-репозитория
+    # (нужен respect_gitignore). Игнор считает сам git — точнее и быстрее, чем обход с .gitignore;
+    # но отслеживаемые (tracked) файлы попадают в результат, даже если подходят под .gitignore.
+    # Без git или вне репозитория — обычный обход.
+    use_git: bool = False
+    # Директория дискового кэша результата scan() (None -> кэш выключен). Запись проверяется по
+    # mtime всех пройденных директорий и mtime/размеру .gitignore и файлов-кандидатов: это
+    # stat'ы без листинга и без матчинга. С use_git кэш не используется (состояние индекса не видно).
+    cache_dir: Optional[Path] = None
 
 
 # =============================================================================
@@ -129,18 +173,37 @@ class IgnoreMatcher:
     """
     Мини-интерфейс матчера игнора.
 
-    ignores(path, is_dir) -> True, если путь нужно пропустить.
+    ignores(path, is_dir) -> True, если путь нужно пропустить (path — Path или str).
     """
-    def ignores(self, path: Path, is_dir: bool) -> bool:  # pragma: no cover
+    def ignores(self, path: Path | str, is_dir: bool) -> bool:  # pragma: no cover
         raise NotImplementedError
 
 
 class NoopIgnoreMatcher(IgnoreMatcher):
     """Матчер-заглушка: ничего не игнорирует."""
-    def ignores(self, path: Path, is_dir: bool) -> bool:
+    def ignores(self, path: Path | str, is_dir: bool) -> bool:
         return False
 
 
+def _dir_str_and_prefix(dir_path: Path | str) -> Tuple[str, str]:
+    """str(dir_path) и он же с завершающим разделителем (для проверки «лежит внутри»)."""
+    dir_str = os.fspath(dir_path)
+    return dir_str, dir_str if dir_str.endswith(os.sep) else dir_str + os.sep
+
+
+def _rel_posix(path_str: str, base_str: str, base_prefix: str) -> Optional[str]:
+    """
+    Posix-путь path относительно base (как `path.relative_to(base).as_posix()`) или None,
+    если path не внутри base. Пути сравниваются как строки: сканер строит их от одного root.
+    """
+    if path_str.startswith(base_prefix):
+        rel = path_str[len(base_prefix):]
+        return rel if os.sep == "/" else rel.replace(os.sep, "/")
+    if path_str == base_str:
+        return "."
+    return None
+
+
 class GitignoreMatcher(IgnoreMatcher):
     """
     Поддержка нескольких .gitignore внутри репозитория.
@@ -153,108 +216,298 @@ class GitignoreMatcher(IgnoreMatcher):
 
     Реализация:
       - если установлен pathspec: используем gitwildmatch (максимально близко к git)
-      - иначе: используем консервативный fnmatch fallback
+      - иначе: используем консервативный fnmatch-совместимый fallback (_FallbackRules)
     """
 
     def __init__(self, root: Path):
         self.root = root
+        self._root_str, self._root_prefix = _dir_str_and_prefix(root)
         self._has_pathspec = False
-        self._stack: List[Tuple[Path, object]] = []  # (base_dir, compiled_spec_or_rules)
+        # (base_dir, str(base_dir), str(base_dir) + sep, compiled_spec_or_rules)
+        self._stack: List[Tuple[Path, str, str, object]] = []
+        # Прочитанные .gitignore этого матчера: путь -> (st_mtime_ns, st_size) (см. loaded_files).
+        self._loaded: Dict[str, Tuple[int, int]] = {}
 
         try:
-            import pathspec  # type: ignore
-            self._pathspec = pathspec
+            import pathspec  # type: ignore  # noqa: F401
             self._has_pathspec = True
         except Exception:
-            self._pathspec = None
             self._has_pathspec = False
 
-    def push_dir(self, dir_path: Path) -> None:
-        """Если в dir_path есть .gitignore — прочитать и добавить правила в стек."""
-        gitignore = dir_path / ".gitignore"
-        if not gitignore.is_file():
-            return
+    def push_dir(self, dir_path: Path, gitignore_entry: Optional[os.DirEntry[str]] = None) -> None:
+        """
+        Если в dir_path есть .gitignore — прочитать и добавить правила в стек.
 
+        gitignore_entry — уже найденный в листинге dir_path DirEntry этого .gitignore
+        (так делает _walk_dirs: для директорий без .gitignore push_dir вообще не вызывается).
+        """
+        gitignore = os.path.join(dir_path, ".gitignore")
         try:
-            raw = gitignore.read_text(encoding="utf-8", errors="replace").splitlines()
+            st = gitignore_entry.stat() if gitignore_entry is not None else os.stat(gitignore)
         except OSError:
             return
+        if not stat.S_ISREG(st.st_mode):
+            return
 
-        lines: List[str] = []
-        for line in raw:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            lines.append(line)
+        try:
+            spec_or_rules = _load_gitignore(gitignore, st.st_mtime_ns, st.st_size, self._has_pathspec)
+        except OSError:
+            return
+        self._loaded[gitignore] = (st.st_mtime_ns, st.st_size)
 
-        if not lines:
+        if spec_or_rules is None:
             return
+        self._stack.append((dir_path, *_dir_str_and_prefix(dir_path), spec_or_rules))
 
-        if self._has_pathspec:
-            spec = self._pathspec.PathSpec.from_lines("gitwildmatch", lines)
-            self._stack.append((dir_path, spec))
-        else:
-            self._stack.append((dir_path, list(lines)))
+    def loaded_files(self) -> List[Tuple[str, int, int]]:
+        """Прочитанные .gitignore: (путь, st_mtime_ns, st_size) — для проверки кэша скана."""
+        return [(path, mtime_ns, size) for path, (mtime_ns, size) in self._loaded.items()]
 
     def pop_dir(self, dir_path: Path) -> None:
         """Снять верхний уровень правил, если он относится к dir_path."""
         if self._stack and self._stack[-1][0] == dir_path:
             self._stack.pop()
 
-    def ignores(self, path: Path, is_dir: bool) -> bool:
+    def ignores(self, path: Path | str, is_dir: bool) -> bool:
         """
         Проверяет, игнорируется ли path текущими правилами стека.
 
         Важно:
         - если path не лежит внутри root — ничего не игнорируем
         - при fallback-режиме поддерживаем общий смысл gitignore, но не 100% эквивалент git
+        - path можно передать строкой (как её строит scan): относительный путь считается
+          срезом по строковому префиксу base_dir, без Path.relative_to на каждый уровень стека
         """
-        rel_to_root = self._safe_rel(path, self.root)
-        if rel_to_root is None:
+        if not self._stack:
+            # Ни одного .gitignore на текущем пути — типичный случай для большинства директорий.
+            return False
+
+        path_str = os.fspath(path)
+        if _rel_posix(path_str, self._root_str, self._root_prefix) is None:
             return False
 
         ignored: Optional[bool] = None
 
-        for base_dir, spec_or_rules in self._stack:
-            rel_to_base = self._safe_rel(path, base_dir)
-            if rel_to_base is None:
+        for _, base_str, base_prefix, spec_or_rules in self._stack:
+            rel_str = _rel_posix(path_str, base_str, base_prefix)
+            if rel_str is None:
                 continue
 
             if self._has_pathspec:
-                rel_str = rel_to_base.as_posix()
-                if spec_or_rules.match_file(rel_str):
+                if spec_or_rules.match_file(rel_str):  # type: ignore[attr-defined]
                     ignored = True
                 continue
 
-            rules: Sequence[str] = spec_or_rules  # type: ignore[assignment]
-            rel_str = rel_to_base.as_posix()
-            ignored = self._fallback_eval_rules(rules, rel_str, is_dir, ignored)
+            rules: _FallbackRules = spec_or_rules  # type: ignore[assignment]
+            ignored = rules.evaluate(rel_str, is_dir, ignored)
 
         return bool(ignored)
 
-    @staticmethod
-    def _safe_rel(path: Path, base: Path) -> Optional[Path]:
-        """path.relative_to(base), но без исключений."""
+
+class _PathSpecRules:
+    """
+    Правила PathSpec одного .gitignore в виде, удобном для быстрой проверки.
+
+    PathSpec.match_file прогоняет regex каждого шаблона по очереди (для типового
+    .gitignore на ~100 строк — ~100 вызовов на каждый путь). Результат тот же —
+    include *последнего* совпавшего шаблона, — но считается так:
+
+    - простые шаблоны `name`, `name/`, `*suffix`, `*suffix/` (без других glob-символов)
+      проверяются по компонентам пути: точное имя — поиском в dict, суффикс — одним
+      `str.endswith(tuple)` как префильтром. Шаблон попадает сюда, только если
+      pathspec скомпилировал его ровно в ожидаемую регулярку;
+    - остальные шаблоны склеены в альтернации в обратном порядке (match() находит
+      последний совпавший): «плавающие» `^(?:.+/)?X` проверяются по границам
+      компонентов, прочие — одной регуляркой с начала пути.
+    """
+
+    __slots__ = (
+        "_include",
+        "_names",
+        "_dir_names",
+        "_suffixes",
+        "_suffix_rules",
+        "_anchored",
+        "_floating",
+        "_full",
+    )
+
+    # Именованные группы шаблонов pathspec (например (?P<ps_d>/)) в склейке повторялись бы.
+    _NAMED_GROUP_RE = re.compile(r"\(\?P<[A-Za-z_][A-Za-z0-9_]*>")
+    _FLOATING_PREFIX = "^(?:.+/)?"
+    # `name`, `name/`, `*suffix`, `*suffix/` — без прочих glob-символов, '/' и экранирования.
+    _SIMPLE_LINE_RE = re.compile(r"(\*?)([^*?\[\]\\/]+)(/?)")
+
+    def __init__(self) -> None:
+        self._include: List[bool] = []
+        self._names: Dict[str, int] = {}
+        self._dir_names: Dict[str, int] = {}
+        self._suffixes: Tuple[str, ...] = ()
+        # (suffix, rule_index, dir_only) по убыванию rule_index
+        self._suffix_rules: List[Tuple[str, int, bool]] = []
+        self._anchored: Optional[re.Pattern[str]] = None
+        self._floating: Optional[re.Pattern[str]] = None
+        self._full: Optional[re.Pattern[str]] = None
+
+    @classmethod
+    def from_spec(cls, spec: Any, lines: Sequence[str]) -> Optional["_PathSpecRules"]:
+        """
+        Сборка из PathSpec (и строк, из которых он создан) или None, если шаблоны
+        не укладываются в ожидаемую форму — тогда вызывающий код использует сам PathSpec.
+        """
         try:
-            return path.relative_to(base)
-        except ValueError:
+            patterns = list(spec.patterns)
+            if len(patterns) != len(lines):
+                return None
+
+            rules = cls()
+            anchored: List[str] = []
+            floating: List[str] = []
+            full: List[str] = []
+            for line, pattern in zip(lines, patterns):
+                if pattern.include is None:
+                    continue
+                regex = pattern.regex
+                # Работаем только со str-шаблонами без особых флагов.
+                if (
+                    not isinstance(regex, re.Pattern)
+                    or not isinstance(regex.pattern, str)
+                    or regex.flags & ~re.UNICODE
+                ):
+                    return None
+
+                idx = len(rules._include)
+                rules._include.append(bool(pattern.include))
+
+                body = cls._NAMED_GROUP_RE.sub("(?:", regex.pattern)
+                if not body.startswith("^"):
+                    # pattern.match_file делает search(): неякорённый шаблон (например "*") может
+                    # совпасть с любой позиции, а склейка проверяется через match() с начала.
+                    body = r"[\s\S]*?(?:" + body + ")"
+                alt = f"(?P<r{idx}>{body})"
+                full.append(alt)
+
+                if cls._add_simple(rules, line, regex.pattern, idx):
+                    continue
+                if body.startswith(cls._FLOATING_PREFIX):
+                    floating.append(f"(?P<r{idx}>{body[len(cls._FLOATING_PREFIX):]})")
+                else:
+                    anchored.append(alt)
+
+            if not rules._include:
+                return None
+            rules._suffix_rules.sort(key=lambda rule: rule[1], reverse=True)
+            rules._suffixes = tuple(suffix for suffix, _, _ in rules._suffix_rules)
+            rules._anchored = _compile_reversed_alternation(anchored)
+            rules._floating = _compile_reversed_alternation(floating)
+            rules._full = _compile_reversed_alternation(full)
+            return rules
+        except (AttributeError, TypeError, re.error):
             return None
 
-    @staticmethod
-    def _fallback_eval_rules(
-        rules: Sequence[str],
-        rel_path_posix: str,
-        is_dir: bool,
-        current: Optional[bool],
-    ) -> Optional[bool]:
-        """
-        Fallback интерпретация gitignore-подобных правил через fnmatch.
+    @classmethod
+    def _add_simple(cls, rules: "_PathSpecRules", line: str, regex_text: str, idx: int) -> bool:
+        """Раскладывает простой шаблон по таблицам; False — шаблон не простой."""
+        text = line[1:] if line.startswith("!") else line
+        m = cls._SIMPLE_LINE_RE.fullmatch(text)
+        if m is None:
+            return False
+        star, literal, slash = m.groups()
+        dir_only = bool(slash)
+        tail = "(?P<ps_d>/)" if dir_only else "(?:(?P<ps_d>/)|$)"
+        expected = cls._FLOATING_PREFIX + ("[^/]*" if star else "") + re.escape(literal) + tail
+        if regex_text != expected:
+            return False
+
+        if star:
+            rules._suffix_rules.append((literal, idx, dir_only))
+        else:
+            # При повторе имени побеждает последнее правило (больший индекс).
+            (rules._dir_names if dir_only else rules._names)[literal] = idx
+        return True
+
+    def match_file(self, rel_path_posix: str) -> bool:
+        """Как PathSpec.match_file для уже нормализованного posix-пути."""
+        rel = rel_path_posix
+        if "\n" in rel or rel.startswith("/"):
+            # `.+/` не проходит через перевод строки, а ведущий '/' не даёт границы компонента:
+            # здесь разбор по компонентам не эквивалентен — проверяем общей склейкой.
+            m = self._full.match(rel) if self._full is not None else None
+            return m is not None and self._include[int(m.lastgroup[1:])]  # type: ignore[index]
+
+        last = -1
+        names = self._names
+        dir_names = self._dir_names
+        suffixes = self._suffixes
+        parts = rel.split("/")
+        last_part = len(parts) - 1
+        for i, part in enumerate(parts):
+            if names:
+                idx = names.get(part, -1)
+                if idx > last:
+                    last = idx
+            if dir_names and i < last_part:
+                idx = dir_names.get(part, -1)
+                if idx > last:
+                    last = idx
+            if suffixes and part.endswith(suffixes):
+                for suffix, idx, dir_only in self._suffix_rules:
+                    if idx <= last:
+                        break
+                    if part.endswith(suffix) and (not dir_only or i < last_part):
+                        last = idx
+                        break
+
+        if self._anchored is not None:
+            m = self._anchored.match(rel)
+            if m is not None:
+                idx = int(m.lastgroup[1:])  # type: ignore[index]
+                if idx > last:
+                    last = idx
+
+        if self._floating is not None:
+            # `(?:.+/)?X` == X совпадает с начала пути или сразу после любого '/'.
+            match = self._floating.match
+            pos = 0
+            while True:
+                m = match(rel, pos)
+                if m is not None:
+                    idx = int(m.lastgroup[1:])  # type: ignore[index]
+                    if idx > last:
+                        last = idx
+                slash = rel.find("/", pos)
+                if slash < 0:
+                    break
+                pos = slash + 1
+
+        return last >= 0 and self._include[last]
+
+
+class _FallbackRules:
+    """
+    Правила одного .gitignore для fallback-режима (без pathspec), скомпилированные один раз в push_dir.
+
+    Семантика прежняя (fnmatch на правило):
+    - поддерживает negation (!)
+    - поддерживает dir-only правила (оканчиваются на '/')
+    - правило с '/' сопоставляется со всем относительным путём, без '/' — с любым компонентом пути
+    - последнее совпавшее правило побеждает (как в git)
+
+    Вместо цикла fnmatch по правилам все правила склеены в альтернацию регулярок
+    (по одной на «весь путь» и «компонент», отдельно для файлов и директорий).
+    Альтернативы идут в обратном порядке, поэтому fullmatch находит *последнее*
+    совпавшее правило; его номер берётся из имени группы.
+    """
+
+    __slots__ = ("negated", "path_file", "path_dir", "part_file", "part_dir")
+
+    def __init__(self, rules: Sequence[str]):
+        self.negated: List[bool] = []
+        path_file: List[str] = []
+        path_dir: List[str] = []
+        part_file: List[str] = []
+        part_dir: List[str] = []
 
-        Особенности:
-        - поддерживает negation (!)
-        - поддерживает dir-only правила (оканчиваются на '/')
-        - последнее совпавшее правило побеждает (как в git)
-        """
         for pat in rules:
             neg = pat.startswith("!")
             pat_clean = pat[1:] if neg else pat
@@ -262,27 +515,94 @@ class GitignoreMatcher(IgnoreMatcher):
             dir_only = pat_clean.endswith("/")
             if dir_only:
                 pat_clean = pat_clean[:-1]
-                if not is_dir:
-                    continue
 
             if not pat_clean:
                 continue
 
-            matched = False
+            idx = len(self.negated)
+            self.negated.append(neg)
+            # fnmatch(name, pat) == fnmatchcase(normcase(name), normcase(pat))
+            alt = f"(?P<r{idx}>{fnmatch.translate(os.path.normcase(pat_clean))})"
             if "/" in pat_clean:
-                matched = fnmatch(rel_path_posix, pat_clean)
+                path_dir.append(alt)
+                if not dir_only:
+                    path_file.append(alt)
             else:
-                # Пытаемся сопоставить по имени, а затем по компонентам пути
-                if fnmatch(Path(rel_path_posix).name, pat_clean):
-                    matched = True
-                else:
-                    parts = rel_path_posix.split("/")
-                    matched = any(fnmatch(p, pat_clean) for p in parts)
+                part_dir.append(alt)
+                if not dir_only:
+                    part_file.append(alt)
+
+        self.path_file = _compile_reversed_alternation(path_file)
+        self.path_dir = _compile_reversed_alternation(path_dir)
+        self.part_file = _compile_reversed_alternation(part_file)
+        self.part_dir = _compile_reversed_alternation(part_dir)
+
+    def evaluate(self, rel_path_posix: str, is_dir: bool, current: Optional[bool]) -> Optional[bool]:
+        """Итог после применения правил уровня: not negated последнего совпавшего правила, иначе current."""
+        rel = os.path.normcase(rel_path_posix)
+        path_re, part_re = (self.path_dir, self.part_dir) if is_dir else (self.path_file, self.part_file)
+
+        last = -1
+        if path_re is not None:
+            m = path_re.fullmatch(rel)
+            if m is not None:
+                last = int(m.lastgroup[1:])  # type: ignore[index]
+        if part_re is not None:
+            fullmatch = part_re.fullmatch
+            for part in rel.split("/"):
+                m = fullmatch(part)
+                if m is not None:
+                    idx = int(m.lastgroup[1:])  # type: ignore[index]
+                    if idx > last:
+                        last = idx
+
+        if last < 0:
+            return current
+        return not self.negated[last]
+
+
+def _compile_reversed_alternation(alternatives: List[str]) -> Optional[re.Pattern[str]]:
+    """Альтернация в обратном порядке (последнее правило — первым); None, если правил нет."""
+    if not alternatives:
+        return None
+    return re.compile("|".join(reversed(alternatives)))
+
+
+@functools.lru_cache(maxsize=_GITIGNORE_CACHE_SIZE)
+def _load_gitignore(path: str, mtime_ns: int, size: int, use_pathspec: bool) -> object:
+    """
+    Прочитать и скомпилировать .gitignore (см. _compile_gitignore); OSError пробрасывается.
 
-            if matched:
-                current = (not neg)
+    Кэш общий для всех сканеров процесса: сервис создаёт FileScanner на каждый запрос,
+    а компиляция правил — самая дорогая часть первого обхода. Ключ включает st_mtime_ns
+    и st_size, так что изменённый файл перечитывается; размер кэша ограничен (LRU).
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        raw = f.read().splitlines()
+    return _compile_gitignore(raw, use_pathspec)
 
-        return current
+
+def _compile_gitignore(raw: List[str], use_pathspec: bool) -> object:
+    """
+    Строки .gitignore -> объект с match_file (PathSpec или его склейка _PathSpecRules)
+    либо _FallbackRules без pathspec; None, если правил нет.
+    """
+    lines: List[str] = []
+    for line in raw:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        lines.append(line)
+
+    if not lines:
+        return None
+
+    if use_pathspec:
+        import pathspec  # type: ignore
+
+        spec = pathspec.PathSpec.from_lines("gitwildmatch", lines)
+        return _PathSpecRules.from_spec(spec, lines) or spec
+    return _FallbackRules(lines)
 
 
 # =============================================================================
@@ -325,6 +645,21 @@ class FileScanner:
         if not self.root.is_dir():
             raise ValueError(f"Root path is not a directory: {self.root}")
 
+        if self.config.use_git and self.config.respect_gitignore:
+            listed = self._git_ls_files()
+            if listed is not None:
+                return self._scan_listed(listed)
+
+        cache_file = self._cache_file()
+        if cache_file is not None:
+            cached = self._cache_load(cache_file)
+            if cached is not None:
+                return cached
+        scan_started_ns = time.time_ns()
+        # Отметки для проверки кэша: (директория, st_mtime_ns) и (файл-кандидат, st_mtime_ns, st_size).
+        dir_marks: Optional[List[Tuple[str, int]]] = [] if cache_file is not None else None
+        file_marks: Optional[List[Tuple[str, int, int]]] = [] if cache_file is not None else None
+
         stats = ScanStats()
         python_files: List[Path] = []
 
@@ -333,14 +668,31 @@ class FileScanner:
         pyproject_file: Optional[Path] = None
         setup_cfg_file: Optional[Path] = None
 
-        for dir_path, files in self._walk_dirs(stats):
+        skip_symlinks = self.config.skip_symlinks
+        respect_gitignore = self.config.respect_gitignore
+        binary_extensions = _lowered(self.config.binary_extensions)
+
+        for dir_path, entries in self._walk_dirs(stats):
             stats.visited_dirs += 1
+            if dir_marks is not None:
+                try:
+                    dir_str = str(dir_path)
+                    dir_marks.append((dir_str, os.stat(dir_str).st_mtime_ns))
+                except OSError:
+                    dir_marks = None  # без отметки директории запись кэша не проверить — не сохраняем
 
-            # Dependency files in this directory (если удовлетворяют общим условиям)
-            for name in DEPENDENCY_FILENAMES:
-                if name in files:
-                    p = dir_path / name
-                    if self._should_collect_file(p, stats):
+            # Один проход по файлам директории: dependency-файлы и .py-кандидаты.
+            for e in entries:
+                stats.visited_files += 1
+                name = e.name
+
+                # Dependency files (если удовлетворяют общим условиям); дальше они идут по
+                # тем же проверкам, что и остальные файлы, — ради счётчиков stats.
+                if name in _DEPENDENCY_FILENAME_SET:
+                    if file_marks is not None:
+                        _mark_entry(e, file_marks)
+                    if self._should_collect_entry(e, stats):
+                        p = dir_path / name
                         dependency_files.setdefault(name, p)
                         if name == "requirements.txt" and requirements_file is None:
                             requirements_file = p
@@ -349,35 +701,38 @@ class FileScanner:
                         elif name == "setup.cfg" and setup_cfg_file is None:
                             setup_cfg_file = p
 
-            for filename in files:
-                stats.visited_files += 1
-                file_path = dir_path / filename
-
-                if self.config.skip_symlinks and file_path.is_symlink():
+                # is_symlink() у DirEntry берётся из кэша scandir, без lstat.
+                if skip_symlinks and e.is_symlink():
                     stats.skipped_symlink += 1
                     continue
 
-                if self.config.respect_gitignore and self._ignore.ignores(file_path, is_dir=False):
+                # e.path — уже готовая строка os.path.join(dir, name) из scandir.
+                if respect_gitignore and self._ignore.ignores(e.path, is_dir=False):
                     stats.skipped_by_gitignore += 1
                     continue
 
-                if file_path.suffix.lower() in self.config.binary_extensions:
+                suffix = _suffix_lower(name)
+                if suffix in binary_extensions:
                     stats.skipped_binary_ext += 1
                     continue
 
-                if file_path.suffix.lower() != ".py":
+                if suffix != ".py":
                     continue
 
-                if not self._should_collect_file(file_path, stats):
-                    # _should_collect_file уже увеличил нужный skipped_* счётчик
+                if file_marks is not None:
+                    _mark_entry(e, file_marks)
+                if not self._should_collect_entry(e, stats):
+                    # _should_collect_entry уже увеличил нужный skipped_* счётчик
                     continue
 
-                python_files.append(file_path)
+                # dir_path / name, а не Path(строка): части пути директории не парсятся заново
+                # и разделяются всеми её файлами (одни и те же объекты строк в parts).
+                python_files.append(dir_path / name)
                 stats.collected_python_files += 1
 
-        python_files.sort()
+        _sort_paths(python_files)
 
-        return ScanResult(
+        result = ScanResult(
             python_files=python_files,
             requirements_file=requirements_file,
             pyproject_file=pyproject_file,
@@ -385,83 +740,337 @@ class FileScanner:
             dependency_files=dependency_files,
             stats=stats,
         )
+        if cache_file is not None and dir_marks is not None and file_marks is not None:
+            if isinstance(self._ignore, GitignoreMatcher):
+                file_marks.extend(self._ignore.loaded_files())
+            self._cache_store(cache_file, result, dir_marks, file_marks, scan_started_ns)
+        return result
+
+    def _git_ls_files(self) -> Optional[List[str]]:
+        """
+        Пути (относительно root, через '/') из `git ls-files -co --exclude-standard -z`:
+        отслеживаемые файлы + неотслеживаемые, не попавшие под .gitignore/exclude.
+
+        None — git не установлен, root не в репозитории, root игнорируется родительским
+        репозиторием (тогда git не перечислит в нём ничего) или команда не отработала.
+        """
+        git = _git_executable()
+        if git is None:
+            return None
+        try:
+            prefix = subprocess.run(
+                [git, "-C", str(self.root), "rev-parse", "--show-prefix"],
+                check=True,
+                capture_output=True,
+                timeout=_GIT_LS_FILES_TIMEOUT_SEC,
+            ).stdout.strip()
+            # root — поддиректория репозитория: если она сама под .gitignore родителя,
+            # listing пуст, хотя обычный обход (без родительских правил) нашёл бы файлы.
+            if prefix and subprocess.run(
+                [git, "-C", str(self.root), "check-ignore", "-q", "."],
+                capture_output=True,
+                timeout=_GIT_LS_FILES_TIMEOUT_SEC,
+            ).returncode != 1:
+                return None
+            proc = subprocess.run(
+                [git, "-C", str(self.root), "ls-files", "-co", "--exclude-standard", "-z"],
+                check=True,
+                capture_output=True,
+                timeout=_GIT_LS_FILES_TIMEOUT_SEC,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return [os.fsdecode(raw) for raw in proc.stdout.split(b"\0") if raw]
+
+    def _scan_listed(self, listed: List[str]) -> ScanResult:
+        """
+        scan() по готовому списку файлов от git: без обхода директорий и матчинга .gitignore.
 
-    def _walk_dirs(self, stats: ScanStats) -> Iterable[Tuple[Path, List[str]]]:
+        Остальные правила те же: skip_dirs (по компонентам пути), symlink'и, бинарные
+        расширения, лимит размера. Dependency-файл каждого типа — первый в порядке обхода
+        (файлы директории раньше её поддиректорий, поддиректории по имени), как у _walk_dirs.
+        """
+        stats = ScanStats()
+        python_files: List[Path] = []
+        dependency_files: Dict[str, Path] = {}
+        dependency_keys: Dict[str, List[Tuple[int, str]]] = {}
+        visited_dirs: Set[str] = set()
+
+        root_str = str(self.root)
+        skip_dirs = self.config.skip_dirs
+        skip_symlinks = self.config.skip_symlinks
+        binary_extensions = _lowered(self.config.binary_extensions)
+        max_size = self.config.max_file_size_bytes
+
+        for rel in listed:
+            # Вложенные неотслеживаемые репозитории git отдаёт как "dir/".
+            if rel.endswith("/"):
+                continue
+            dir_rel, _, name = rel.rpartition("/")
+            dir_parts = dir_rel.split("/") if dir_rel else []
+            if any(part in skip_dirs for part in dir_parts):
+                stats.skipped_by_dir_rule += 1
+                continue
+
+            full = os.path.join(root_str, rel)
+            try:
+                st = os.lstat(full)
+                if stat.S_ISLNK(st.st_mode):
+                    if skip_symlinks:
+                        stats.skipped_symlink += 1
+                        continue
+                    st = os.stat(full)
+            except FileNotFoundError:
+                # В индексе, но удалён из рабочего дерева.
+                continue
+            except OSError:
+                stats.skipped_io_error += 1
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                # например, gitlink сабмодуля
+                continue
+
+            visited_dirs.add(dir_rel)
+            stats.visited_files += 1
+
+            if name in _DEPENDENCY_FILENAME_SET:
+                if st.st_size > max_size:
+                    stats.skipped_too_large += 1
+                else:
+                    # Ключ порядка обхода: (0, "") — «файл этой директории», он раньше любой поддиректории.
+                    key = [(1, part) for part in dir_parts] + [(0, "")]
+                    if name not in dependency_keys or key < dependency_keys[name]:
+                        dependency_keys[name] = key
+                        dependency_files[name] = Path(full)
+
+            suffix = _suffix_lower(name)
+            if suffix in binary_extensions:
+                stats.skipped_binary_ext += 1
+                continue
+
+            if suffix != ".py":
+                continue
+
+            if st.st_size > max_size:
+                stats.skipped_too_large += 1
+                continue
+
+            python_files.append(Path(full))
+            stats.collected_python_files += 1
+
+        stats.visited_dirs = len(visited_dirs)
+        _sort_paths(python_files)
+
+        return ScanResult(
+            python_files=python_files,
+            requirements_file=dependency_files.get("requirements.txt"),
+            pyproject_file=dependency_files.get("pyproject.toml"),
+            setup_cfg_file=dependency_files.get("setup.cfg"),
+            dependency_files={name: dependency_files[name] for name in DEPENDENCY_FILENAMES if name in dependency_files},
+            stats=stats,
+        )
+
+    def _walk_dirs(self, stats: ScanStats) -> Iterable[Tuple[Path, List[os.DirEntry[str]]]]:
         """
         Обход директорий на базе `os.scandir`.
 
+        Не os.fwalk: он отдаёт только имена (без d_type), так что на каждый файл нужен
+        lstat для symlink/типа, плюс open/close fd на каждую директорию — выходит медленнее.
+
         Делает:
         - pruning по `skip_dirs`
         - pruning по `.gitignore` (для директорий), если включено
         - обработку symlink’ов согласно конфигу
         - сбор статистики по пропускам/ошибкам
 
-        Возвращает итератор пар (dir_path, files_in_dir).
-        """
+        Возвращает итератор пар (dir_path, file_entries): файлы отдаются как `os.DirEntry`,
+        чтобы scan() брал тип/symlink/stat из кэша scandir, а не повторными syscalls по Path.
 
-        def iter_dir(dir_path: Path) -> Iterable[Tuple[Path, List[str]]]:
-            try:
-                with os.scandir(dir_path) as it:
-                    entries = list(it)
-            except OSError:
-                stats.skipped_io_error += 1
-                return
+        При max_workers > 1 листинги поддиректорий читаются пулом потоков заранее (вместе со
+        stat файлов-кандидатов, см. _prefetch_dir), а сам обход (порядок, стек .gitignore,
+        статистика) остаётся последовательным — результат тот же, что и без пула.
+        """
+        pool: Optional[ThreadPoolExecutor] = None
+        if self.config.max_workers > 1:
+            pool = ThreadPoolExecutor(max_workers=self.config.max_workers)
 
-            files: List[str] = []
-            subdirs: List[Path] = []
+        matcher: Optional[GitignoreMatcher] = None
+        if self.config.respect_gitignore and isinstance(self._ignore, GitignoreMatcher):
+            matcher = self._ignore
+        skip_symlinks = self.config.skip_symlinks
+        follow_symlinks = not skip_symlinks
+        skip_dirs = self.config.skip_dirs
+        respect_gitignore = self.config.respect_gitignore
+
+        # Явный стек вместо рекурсивного генератора: без цепочки `yield from` глубиной с дерево
+        # (каждый yield проходил через все кадры) и без RecursionError на глубоких деревьях.
+        # Элемент: (dir_path, заранее запрошенный листинг | None, is_pop_marker).
+        # Маркер кладётся под детей директории с .gitignore и снимает её правила после их обхода.
+        stack: List[Tuple[Path, Optional[Future[List[os.DirEntry[str]]]], bool]] = [(self.root, None, False)]
+        try:
+            while stack:
+                dir_path, listing, is_pop_marker = stack.pop()
+                if is_pop_marker:
+                    if matcher is not None:
+                        matcher.pop_dir(dir_path)
+                    continue
 
-            for e in entries:
                 try:
-                    if self.config.skip_symlinks and e.is_symlink():
-                        stats.skipped_symlink += 1
-                        continue
+                    entries = listing.result() if listing is not None else _list_dir(dir_path)
+                except OSError:
+                    stats.skipped_io_error += 1
+                    continue
 
-                    if e.is_dir(follow_symlinks=not self.config.skip_symlinks):
-                        if e.name in self.config.skip_dirs:
-                            stats.skipped_by_dir_rule += 1
+                # .gitignore ищем в уже полученном листинге: без stat на каждую директорию.
+                if matcher is not None:
+                    for e in entries:
+                        if e.name == ".gitignore":
+                            matcher.push_dir(dir_path, e)
+                            stack.append((dir_path, None, True))
+                            break
+
+                files: List[os.DirEntry[str]] = []
+                subdirs: List[Path] = []
+
+                for e in entries:
+                    try:
+                        if skip_symlinks and e.is_symlink():
+                            stats.skipped_symlink += 1
                             continue
 
-                        p = Path(e.path)
+                        if e.is_dir(follow_symlinks=follow_symlinks):
+                            if e.name in skip_dirs:
+                                stats.skipped_by_dir_rule += 1
+                                continue
 
-                        if self.config.respect_gitignore and self._ignore.ignores(p, is_dir=True):
-                            stats.skipped_by_gitignore += 1
-                            continue
+                            if respect_gitignore and self._ignore.ignores(e.path, is_dir=True):
+                                stats.skipped_by_gitignore += 1
+                                continue
 
-                        subdirs.append(p)
+                            subdirs.append(Path(e.path))
 
-                    elif e.is_file(follow_symlinks=not self.config.skip_symlinks):
-                        files.append(e.name)
+                        elif e.is_file(follow_symlinks=follow_symlinks):
+                            files.append(e)
 
-                except OSError:
-                    stats.skipped_io_error += 1
-                    continue
+                    except OSError:
+                        stats.skipped_io_error += 1
+                        continue
 
-            yield dir_path, files
+                _sort_paths(subdirs)
+                # Листинги поддиректорий ставим в пул сразу: пока обходится первая, остальные уже читаются.
+                listings: List[Optional[Future[List[os.DirEntry[str]]]]] = (
+                    [pool.submit(_prefetch_dir, sd) for sd in subdirs] if pool is not None else [None] * len(subdirs)
+                )
 
-            for sd in sorted(subdirs):
-                if self.config.respect_gitignore and isinstance(self._ignore, GitignoreMatcher):
-                    self._ignore.push_dir(sd)
-                yield from iter_dir(sd)
-                if self.config.respect_gitignore and isinstance(self._ignore, GitignoreMatcher):
-                    self._ignore.pop_dir(sd)
+                yield dir_path, files
 
-        if self.config.respect_gitignore and isinstance(self._ignore, GitignoreMatcher):
-            self._ignore.push_dir(self.root)
-        yield from iter_dir(self.root)
-        if self.config.respect_gitignore and isinstance(self._ignore, GitignoreMatcher):
-            self._ignore.pop_dir(self.root)
+                # В обратном порядке: первой со стека снимется первая по сортировке поддиректория.
+                for sd, sd_listing in zip(reversed(subdirs), reversed(listings)):
+                    stack.append((sd, sd_listing, False))
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    # -------------------------------------------------------------------------
+    # Disk cache
+    # -------------------------------------------------------------------------
+
+    def _cache_file(self) -> Optional[Path]:
+        """
+        Файл записи кэша для (root, конфиг) или None, если кэш выключен или включён use_git.
+        В ключ входит всё, что влияет на результат, и режим матчинга .gitignore (pathspec или fallback).
+        """
+        cfg = self.config
+        if cfg.cache_dir is None or (cfg.use_git and cfg.respect_gitignore):
+            return None
+
+        h = hashlib.blake2b(digest_size=16)
+        for part in (
+            _SCAN_CACHE_VERSION,
+            str(self.root),
+            "\0".join(sorted(cfg.skip_dirs)),
+            "\0".join(sorted(cfg.binary_extensions)),
+            str(cfg.max_file_size_bytes),
+            str(cfg.respect_gitignore),
+            str(cfg.skip_symlinks),
+            str(isinstance(self._ignore, GitignoreMatcher) and self._ignore._has_pathspec),
+        ):
+            h.update(part.encode("utf-8", errors="surrogatepass"))
+            h.update(b"\1")
+        return Path(cfg.cache_dir).expanduser() / f"scan-{h.hexdigest()}.pkl"
+
+    def _cache_load(self, entry: Path) -> Optional[ScanResult]:
+        """
+        ScanResult из кэша, если ни одна отметка не изменилась. Любая проблема -> None (промах).
+        """
+        try:
+            with entry.open("rb") as f:
+                payload = pickle.load(f)
+            if payload.get("version") != _SCAN_CACHE_VERSION:
+                return None
+            for path, mtime_ns in payload["dirs"]:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return None
+            for path, mtime_ns, size in payload["files"]:
+                st = os.stat(path)
+                if st.st_mtime_ns != mtime_ns or st.st_size != size:
+                    return None
+            result = payload["result"]
+        except Exception:
+            return None
+
+        return result if isinstance(result, ScanResult) else None
+
+    def _cache_store(
+        self,
+        entry: Path,
+        result: ScanResult,
+        dir_marks: List[Tuple[str, int]],
+        file_marks: List[Tuple[str, int, int]],
+        scan_started_ns: int,
+    ) -> None:
+        """
+        Атомарно кладёт результат в кэш (tmp + os.replace). Ошибки записи игнорируются.
+
+        Не сохраняем, если при обходе были ошибки ввода-вывода или отметки «свежие»
+        (см. _SCAN_CACHE_RACY_NS): такую запись нельзя надёжно проверить по mtime.
+        """
+        if result.stats.skipped_io_error:
+            return
+        racy_from = scan_started_ns - _SCAN_CACHE_RACY_NS
+        if any(mtime_ns >= racy_from for _, mtime_ns in dir_marks):
+            return
+        if any(mtime_ns >= racy_from for _, mtime_ns, _ in file_marks):
+            return
 
-    def _should_collect_file(self, path: Path, stats: ScanStats) -> bool:
+        payload = {
+            "version": _SCAN_CACHE_VERSION,
+            "dirs": dir_marks,
+            "files": file_marks,
+            "result": result,
+        }
+        tmp = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            with tmp.open("wb") as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, entry)
+        except Exception:
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def _should_collect_entry(self, entry: os.DirEntry[str], stats: ScanStats) -> bool:
         """
         Общие проверки для файлов, которые мы потенциально можем включить в результат:
-        - файл должен существовать и быть обычным файлом
         - размер не должен превышать max_file_size_bytes
+
+        Что это обычный файл, уже проверил _walk_dirs (DirEntry.is_file); stat() делается
+        одним syscall и кэшируется в DirEntry.
         """
         try:
-            if not path.is_file():
-                return False
-
-            size = path.stat().st_size
+            size = entry.stat().st_size
             if size > self.config.max_file_size_bytes:
                 stats.skipped_too_large += 1
                 return False
@@ -470,3 +1079,85 @@ class FileScanner:
         except OSError:
             stats.skipped_io_error += 1
             return False
+
+
+def _list_dir(dir_path: Path) -> List[os.DirEntry[str]]:
+    """Листинг одной директории (os.scandir целиком в список); OSError пробрасывается вызывающему."""
+    with os.scandir(dir_path) as it:
+        return list(it)
+
+
+def _prefetch_dir(dir_path: Path) -> List[os.DirEntry[str]]:
+    """
+    _list_dir для пула потоков: заодно делает stat() .py и dependency-файлов, чтобы проверка
+    размера в scan() взяла его из кэша DirEntry, а не ждала syscall (заметно на сетевых ФС).
+    Ошибка stat здесь не кэшируется и не считается — её увидит _should_collect_entry.
+    """
+    entries = _list_dir(dir_path)
+    for e in entries:
+        name = e.name
+        if (name in _DEPENDENCY_FILENAME_SET or _suffix_lower(name) == ".py") and e.is_file(follow_symlinks=False):
+            try:
+                e.stat()
+            except OSError:
+                pass
+    return entries
+
+
+def _mark_entry(entry: os.DirEntry[str], marks: List[Tuple[str, int, int]]) -> None:
+    """Отметка файла-кандидата для кэша скана; stat() берётся из кэша DirEntry."""
+    try:
+        st = entry.stat()
+    except OSError:
+        return  # ошибку посчитает _should_collect_entry, и запись кэша не сохранится
+    marks.append((entry.path, st.st_mtime_ns, st.st_size))
+
+
+def _lowered(extensions: Iterable[str]) -> FrozenSet[str]:
+    """
+    Расширения из конфига в нижнем регистре (один раз на scan): суффикс файла сравнивается
+    уже приведённым к нижнему регистру, так что ".PNG" в конфиге тоже срабатывает.
+    """
+    return frozenset(ext.lower() for ext in extensions)
+
+
+_PATH_PARTS = operator.attrgetter("parts")
+
+
+def _sort_paths(paths: List[Path]) -> None:
+    """
+    Сортирует пути на месте в том же порядке, что и `paths.sort()`.
+
+    Path.__lt__ — Python-метод, и на каждом сравнении заново достаёт части пути; ключ
+    `parts` считается один раз на элемент, а кортежи строк сравниваются в C. На POSIX
+    Path сравнивает ровно эти части. На Windows сравнение без учёта регистра, поэтому
+    там остаётся штатная сортировка. Сортировка по str(path) не подходит: "a-b.py" < "a/b.py".
+    """
+    if os.name == "nt":
+        paths.sort()
+    else:
+        paths.sort(key=_PATH_PARTS)
+
+
+def _suffix_lower(name: str) -> str:
+    """
+    Расширение имени файла в нижнем регистре — как `Path(name).suffix.lower()`, но без Path.
+
+    Как и у pathlib: у ".hidden" и "name." расширения нет.
+    """
+    i = name.rfind(".")
+    if 0 < i < len(name) - 1:
+        return name[i:].lower()
+    return ""
+
+
+def _git_executable() -> Optional[str]:
+    """
+    Путь к git из PATH, найденный один раз на процесс (как в github_fetcher).
+
+    Неудачный поиск не запоминается: если git поставят позже, следующий scan его найдёт.
+    """
+    global _GIT_PATH
+    if _GIT_PATH is None:
+        _GIT_PATH = shutil.which("git")
+    return _GIT_PATH
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
 import hashlib
+import os
 import shutil
 import subprocess
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
+
+from .file_scanner import DEPENDENCY_FILENAMES
+
+# Что нужно анализатору из клона при partial_clone: исходники, dependency-файлы и .gitignore
+# (их читает FileScanner). Шаблоны sparse-checkout в формате .gitignore (non-cone): без "/"
+# совпадают на любой глубине.
+_SPARSE_CHECKOUT_PATTERNS: Tuple[str, ...] = ("*.py", *DEPENDENCY_FILENAMES, ".gitignore")
+
+# Абсолютный путь к git: shutil.which обходит весь PATH со stat на каждый каталог,
+# поэтому ищем один раз на процесс (см. _git_executable).
+_GIT_PATH: Optional[str] = None
 
 
 class GitHubFetcherError(Exception):
@@ -58,6 +70,8 @@ class GitHubFetcher:
     Возможности:
     - кэширует клоны в `workspace_dir` (по sha256(repo_url + ref));
     - shallow clone (`--depth 1`) для скорости;
+    - partial_clone: `--filter=blob:none` + sparse-checkout только нужных анализатору файлов
+      (blob'ы картинок, датасетов и прочих не-Python файлов не скачиваются вовсе);
     - если задан ref: делает `git fetch --depth 1 origin <ref>` и `checkout FETCH_HEAD`;
     - удаляет старые кэши по TTL (cache_ttl_hours).
 
@@ -73,11 +87,13 @@ class GitHubFetcher:
         workspace_dir: Optional[Path] = None,
         timeout_sec: int = 180,
         cache_ttl_hours: int = 72,
+        partial_clone: bool = False,
     ) -> None:
         self.allow_clone = allow_clone
         self.workspace_dir = workspace_dir or Path(".cache") / "repos"
         self.timeout_sec = timeout_sec
         self.cache_ttl_hours = cache_ttl_hours
+        self.partial_clone = partial_clone
 
     def fetch(self, repo_url: str, *, ref: Optional[str] = None) -> FetchResult:
         """
@@ -89,8 +105,9 @@ class GitHubFetcher:
         3) Создаём workspace_dir и чистим кэш по TTL
         4) Определяем target_dir по repo_url + ref
         5) Если .git уже есть — считаем кэш валидным и возвращаем путь
-        6) Иначе: shallow clone
+        6) Иначе: shallow clone (при partial_clone — без blob'ов и без checkout, затем sparse-checkout)
         7) Если задан ref — делаем shallow fetch ref и checkout FETCH_HEAD
+        Если шаги после clone упали — недоделанный клон удаляется, чтобы не стать «валидным» кэшем.
         """
         repo_url = (repo_url or "").strip()
         if not repo_url:
@@ -103,7 +120,7 @@ class GitHubFetcher:
             # Сохраняем исходное поведение/сообщение.
             raise GitHubFetcherNotImplemented("не реализовано")
 
-        if shutil.which("git") is None:
+        if _git_executable() is None:
             raise GitNotInstalled("git is not installed or not in PATH")
 
         self.workspace_dir.mkdir(parents=True, exist_ok=True)
@@ -116,24 +133,26 @@ class GitHubFetcher:
             return FetchResult(repo_url=repo_url, local_path=target_dir, ref=ref)
 
         # Shallow clone для скорости; submodules выключены.
-        self._run(
-            [
-                "git",
-                "clone",
-                "--depth",
-                "1",
-                "--recurse-submodules=no",
-                repo_url,
-                str(target_dir),
-            ],
-            cwd=None,
-        )
-
-        if ref:
-            # Для ветки/тэга shallow clone может не содержать нужный ref.
-            # Поэтому делаем shallow fetch конкретного ref и чекаутим FETCH_HEAD.
-            self._run(["git", "fetch", "--depth", "1", "origin", ref], cwd=target_dir)
-            self._run(["git", "checkout", "FETCH_HEAD"], cwd=target_dir)
+        clone_cmd = ["git", "clone", "--depth", "1", "--recurse-submodules=no"]
+        if self.partial_clone:
+            # Blob'ы докачиваются только при checkout и только для файлов из sparse-checkout.
+            clone_cmd += ["--filter=blob:none", "--no-checkout"]
+        self._run([*clone_cmd, repo_url, str(target_dir)], cwd=None)
+
+        try:
+            if self.partial_clone:
+                self._enable_sparse_checkout(target_dir)
+
+            if ref:
+                # Для ветки/тэга shallow clone может не содержать нужный ref.
+                # Поэтому делаем shallow fetch конкретного ref и чекаутим FETCH_HEAD.
+                self._run(["git", "fetch", "--depth", "1", "origin", ref], cwd=target_dir)
+                self._run(["git", "checkout", "FETCH_HEAD"], cwd=target_dir)
+            elif self.partial_clone:
+                self._run(["git", "checkout"], cwd=target_dir)
+        except BaseException:
+            shutil.rmtree(target_dir, ignore_errors=True)
+            raise
 
         return FetchResult(repo_url=repo_url, local_path=target_dir, ref=ref)
 
@@ -144,9 +163,27 @@ class GitHubFetcher:
         Ключ зависит от ref, чтобы разные ветки/тэги не конфликтовали в одном кэше.
         """
         key = repo_url if not ref else f"{repo_url}#{ref}"
+        if self.partial_clone:
+            # Sparse-клон не должен отдаваться как полный (и наоборот).
+            key += "\0partial"
         h = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
         return self.workspace_dir / h
 
+    def _enable_sparse_checkout(self, target_dir: Path) -> None:
+        """
+        Включает sparse-checkout по _SPARSE_CHECKOUT_PATTERNS.
+
+        Через core.sparseCheckout + .git/info/sparse-checkout, а не `git sparse-checkout set`:
+        так работает на любой версии git и не зависит от того, включён ли по умолчанию cone-режим.
+        """
+        self._run(["git", "config", "core.sparseCheckout", "true"], cwd=target_dir)
+        info_dir = target_dir / ".git" / "info"
+        try:
+            info_dir.mkdir(parents=True, exist_ok=True)
+            (info_dir / "sparse-checkout").write_text("\n".join(_SPARSE_CHECKOUT_PATTERNS) + "\n", encoding="utf-8")
+        except OSError as e:
+            raise CloneFailed(f"cannot configure sparse-checkout: {e}") from e
+
     def _cleanup_cache_ttl(self) -> None:
         """
         Удаляет кэш-директории старше TTL.
@@ -159,38 +196,59 @@ class GitHubFetcher:
             return
 
         now = time.time()
-        for d in self.workspace_dir.iterdir():
-            if not d.is_dir():
-                continue
-            if not (d / ".git").exists():
-                continue
-
-            try:
-                mtime = d.stat().st_mtime
-            except OSError:
-                continue
-
-            if now - mtime > ttl_sec:
-                shutil.rmtree(d, ignore_errors=True)
+        # os.scandir: тип записи берётся из листинга, stat() кэшируется в DirEntry —
+        # без Path на каждую запись и повторных syscalls. Symlink'и на директории не трогаем.
+        with os.scandir(self.workspace_dir) as it:
+            for entry in it:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                if not os.path.exists(os.path.join(entry.path, ".git")):
+                    continue
+
+                try:
+                    mtime = entry.stat(follow_symlinks=False).st_mtime
+                except OSError:
+                    continue
+
+                if now - mtime > ttl_sec:
+                    shutil.rmtree(entry.path, ignore_errors=True)
 
     def _run(self, cmd: list[str], *, cwd: Optional[Path]) -> None:
         """
         Запускает git-команду с таймаутом и превращает ошибки subprocess в CloneFailed.
 
-        capture_output=True + text=True:
-        - позволяет вернуть человеку сообщение из stderr/stdout без лишнего шума.
+        - "git" подменяется найденным абсолютным путём (без поиска по PATH в дочернем процессе);
+        - вывод захватывается байтами и декодируется только для сообщения об ошибке;
+        - stdin=DEVNULL: git не наследует stdin сервиса.
         """
+        argv = cmd
+        git = _git_executable()
+        if git is not None and cmd and cmd[0] == "git":
+            argv = [git, *cmd[1:]]
+
         try:
             subprocess.run(
-                cmd,
+                argv,
                 cwd=str(cwd) if cwd else None,
                 check=True,
+                stdin=subprocess.DEVNULL,
                 capture_output=True,
-                text=True,
                 timeout=self.timeout_sec,
             )
         except subprocess.TimeoutExpired as e:
             raise CloneFailed(f"git timeout after {self.timeout_sec}s: {' '.join(cmd)}") from e
         except subprocess.CalledProcessError as e:
-            msg = (e.stderr or e.stdout or "").strip()
+            msg = (e.stderr or e.stdout or b"").decode("utf-8", errors="replace").strip()
             raise CloneFailed(msg or f"git failed: {' '.join(cmd)}") from e
+
+
+def _git_executable() -> Optional[str]:
+    """
+    Путь к git из PATH, найденный один раз на процесс.
+
+    Неудачный поиск не запоминается: если git поставят позже, следующий fetch его найдёт.
+    """
+    global _GIT_PATH
+    if _GIT_PATH is None:
+        _GIT_PATH = shutil.which("git")
+    return _GIT_PATH
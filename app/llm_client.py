@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import json
-from typing import Optional
+from typing import Iterator, Optional
 from urllib import error as urlerror
 from urllib import request as urlrequest
 
@@ -52,6 +52,78 @@ class LLMClient:
         Ошибки:
         - RuntimeError: LLM выключен/не настроен; сеть/таймаут; не-JSON; неожиданный формат ответа.
         """
+        req = self._build_request(prompt, stream=False)
+
+        try:
+            with urlrequest.urlopen(req, timeout=self.timeout_sec) as resp:
+                # Читаем ответ целиком. (Поведение как было: decode utf-8.)
+                resp_body = resp.read().decode("utf-8")
+        except urlerror.URLError as e:
+            # URLError включает и таймауты, и ошибки соединения.
+            raise RuntimeError(f"LLM HTTP error: {e}") from e
+
+        try:
+            parsed = json.loads(resp_body)
+        except json.JSONDecodeError as e:
+            # Сохраняем прежний смысл: показать сырой ответ (repr), чтобы было что дебажить.
+            raise RuntimeError(f"LLM returned non-JSON response: {resp_body!r}") from e
+
+        try:
+            return parsed["choices"][0]["message"]["content"]
+        except Exception as e:  # noqa: BLE001
+            raise RuntimeError(f"Unexpected LLM response format: {parsed!r}") from e
+
+    def chat_stream(self, prompt: str) -> Iterator[str]:
+        """
+        Потоковый вариант chat(): запрос с `stream=True`, выдаёт фрагменты `delta.content`
+        по мере прихода server-sent events (`data: {...}` ... `data: [DONE]`).
+
+        Закрытие генератора (`.close()`) закрывает HTTP-соединение — так вызывающий код
+        может прервать генерацию, не дожидаясь конца ответа.
+
+        Ошибки: те же RuntimeError, что у chat(), в том числе посреди потока.
+        """
+        req = self._build_request(prompt, stream=True)
+
+        try:
+            resp = urlrequest.urlopen(req, timeout=self.timeout_sec)
+        except urlerror.URLError as e:
+            raise RuntimeError(f"LLM HTTP error: {e}") from e
+
+        with resp:
+            while True:
+                try:
+                    raw_line = resp.readline()
+                except OSError as e:
+                    # таймаут/обрыв соединения посреди потока
+                    raise RuntimeError(f"LLM HTTP error: {e}") from e
+                if not raw_line:
+                    return
+
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue  # пустые строки-разделители событий, комментарии SSE
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+
+                try:
+                    parsed = json.loads(data)
+                except json.JSONDecodeError as e:
+                    raise RuntimeError(f"LLM returned non-JSON stream event: {data!r}") from e
+
+                try:
+                    content = parsed["choices"][0].get("delta", {}).get("content")
+                except Exception as e:  # noqa: BLE001
+                    raise RuntimeError(f"Unexpected LLM stream event format: {parsed!r}") from e
+
+                if content:
+                    yield content
+
+    def _build_request(self, prompt: str, *, stream: bool) -> urlrequest.Request:
+        """
+        Собирает POST-запрос к chat/completions (общий для chat и chat_stream).
+        """
         if not self.is_enabled():
             raise RuntimeError("LLM is disabled or not configured (llm_enabled/api_base/model).")
 
@@ -70,6 +142,8 @@ class LLMClient:
             ],
             "temperature": 0.2,
         }
+        if stream:
+            payload["stream"] = True
 
         data = json.dumps(payload).encode("utf-8")
 
@@ -77,23 +151,4 @@ class LLMClient:
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
 
-        req = urlrequest.Request(url, data=data, headers=headers, method="POST")
-
-        try:
-            with urlrequest.urlopen(req, timeout=self.timeout_sec) as resp:
-                # Читаем ответ целиком. (Поведение как было: decode utf-8.)
-                resp_body = resp.read().decode("utf-8")
-        except urlerror.URLError as e:
-            # URLError включает и таймауты, и ошибки соединения.
-            raise RuntimeError(f"LLM HTTP error: {e}") from e
-
-        try:
-            parsed = json.loads(resp_body)
-        except json.JSONDecodeError as e:
-            # Сохраняем прежний смысл: показать сырой ответ (repr), чтобы было что дебажить.
-            raise RuntimeError(f"LLM returned non-JSON response: {resp_body!r}") from e
-
-        try:
-            return parsed["choices"][0]["message"]["content"]
-        except Exception as e:  # noqa: BLE001
-            raise RuntimeError(f"Unexpected LLM response format: {parsed!r}") from e
+        return urlrequest.Request(url, data=data, headers=headers, method="POST")
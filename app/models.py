@@ -6,7 +6,7 @@ from pathlib import Path
 from typing import Dict, List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionInfo:
     """
     Метаданные о функции или методе в кодовой базе.
@@ -25,7 +25,7 @@ class FunctionInfo:
     decorators: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class AttributeInfo:
     """
     Метаданные об атрибуте класса или экземпляра.
@@ -52,7 +52,7 @@ class AttributeInfo:
     declared_in_init: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class CompositionInfo:
     """
     Связь "A имеет поле типа B" (для диаграмм).
@@ -79,7 +79,7 @@ class CompositionInfo:
     kind: str = "composition"
 
 
-@dataclass
+@dataclass(slots=True)
 class ClassInfo:
     """
     Метаданные о классе в модуле.
@@ -116,7 +116,7 @@ class ClassInfo:
     lineno: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ModuleInfo:
     """
     Метаданные о Python-модуле (файле).
@@ -129,6 +129,12 @@ class ModuleInfo:
       Список топ-уровневых функций, найденных в модуле.
     imports:
       Импорты модуля, сохранённые в строковом виде для отчётов/диаграмм.
+
+    source_encoding / source_used_fallback / source_error:
+      Наблюдаемость чтения исходника: кодировка, признак запасного пути чтения
+      и текст ошибки чтения (если была).
+    parse_error:
+      Текст ошибки парсинга (SyntaxError и т.п.); при ошибке структура модуля пустая.
     """
 
     path: Path
@@ -136,6 +142,11 @@ class ModuleInfo:
     functions: List[FunctionInfo] = field(default_factory=list)
     imports: List[str] = field(default_factory=list)
 
+    source_encoding: Optional[str] = None
+    source_used_fallback: bool = False
+    source_error: Optional[str] = None
+    parse_error: Optional[str] = None
+
 
 @dataclass
 class ProjectModel:
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import atexit
+import multiprocessing
+import threading
 from dataclasses import asdict, is_dataclass
 from datetime import datetime, timezone
 from pathlib import Path
@@ -7,7 +10,7 @@ from typing import Any
 
 from .code_parser import CodeParser
 from .diagram_generator import DiagramAI, DiagramGenerator
-from .file_scanner import FileScanner
+from .file_scanner import FileScanner, FileScannerConfig
 from .github_fetcher import GitHubFetcher
 from .settings import settings
 from .tech_stack_analyzer import TechStackAnalyzer
@@ -88,6 +91,84 @@ def _compute_summary(project_model: Any) -> dict[str, int]:
     }
 
 
+_parsers: dict[tuple[Path | None, bool, int | None], CodeParser] = {}
+_parsers_lock = threading.Lock()
+
+
+def _shared_parser(*, cache_dir: Path | None, resolve_paths: bool, max_workers: int | None) -> CodeParser:
+    """
+    Возвращает CodeParser, переиспользуемый между вызовами анализа.
+
+    Парсер держит in-memory memo по (path, mtime, size), поэтому повторный анализ
+    того же проекта не перечитывает неизменённые файлы.
+
+    Если включён пул процессов (max_workers != 1), он один на парсер и живёт до выхода
+    процесса; процессы стартуют через forkserver/spawn — fork из многопоточного
+    uvicorn может унаследовать чужие захваченные локи и повиснуть.
+    """
+    key = (cache_dir, resolve_paths, max_workers)
+    with _parsers_lock:
+        parser = _parsers.get(key)
+        if parser is None:
+            parser = CodeParser(
+                cache_dir=cache_dir,
+                resolve_paths=resolve_paths,
+                max_workers=max_workers,
+                mp_start_method=_safe_start_method(),
+                keep_pool=True,
+            )
+            _parsers[key] = parser
+        return parser
+
+
+_diagram_ais: dict[tuple[bool, bool, int, Path | None, bool], DiagramAI] = {}
+_diagram_ais_lock = threading.Lock()
+
+
+def _shared_diagram_ai(
+    *,
+    diagram_public_only: bool,
+    diagram_group_by_module: bool,
+    diagram_max_classes: int,
+    cache_dir: Path | None,
+    stream: bool,
+) -> DiagramAI:
+    """
+    Возвращает DiagramAI, переиспользуемый между запросами с теми же настройками.
+
+    DiagramAI держит in-memory LRU проверенных ответов LLM: повторный запрос диаграммы
+    того же проекта отдаётся из памяти, без сети и диска.
+    """
+    key = (diagram_public_only, diagram_group_by_module, diagram_max_classes, cache_dir, stream)
+    with _diagram_ais_lock:
+        diagram_ai = _diagram_ais.get(key)
+        if diagram_ai is None:
+            diagram_ai = DiagramAI(
+                generator=_build_plantuml_generator(
+                    diagram_public_only=diagram_public_only,
+                    diagram_group_by_module=diagram_group_by_module,
+                    diagram_max_classes=diagram_max_classes,
+                ),
+                cache_dir=cache_dir,
+                stream=stream,
+            )
+            _diagram_ais[key] = diagram_ai
+        return diagram_ai
+
+
+def _safe_start_method() -> str:
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+@atexit.register
+def _close_parsers() -> None:
+    with _parsers_lock:
+        parsers = list(_parsers.values())
+    for parser in parsers:
+        parser.close()
+
+
 def _enforce_analysis_root(root: Path) -> None:
     """
     Defense-in-depth "gate": если задан settings.analysis_root, анализируемый root
@@ -175,10 +256,22 @@ def analyze_local_project(
     root = root.resolve()
     _enforce_analysis_root(root)
 
-    scanner = FileScanner(root)
+    scanner = FileScanner(
+        root,
+        FileScannerConfig(
+            max_workers=settings.scanner_max_workers,
+            use_git=settings.scanner_use_git,
+            cache_dir=settings.scanner_cache_dir,
+        ),
+    )
     scan_result = scanner.scan()
 
-    parser = CodeParser()
+    # Пути от сканера уже абсолютные (root resolved); без symlink'ов realpath на файл не нужен.
+    parser = _shared_parser(
+        cache_dir=settings.parser_cache_dir,
+        resolve_paths=not scanner.config.skip_symlinks,
+        max_workers=settings.parser_max_workers,
+    )
     project = parser.parse_files(scan_result.python_files)
 
     # propagate dependency paths into ProjectModel (existing behavior)
@@ -195,15 +288,20 @@ def analyze_local_project(
 
     # --- Diagram generation (safe mode) ---
     if fmt == "plantuml":
-        generator = _build_plantuml_generator(
-            diagram_public_only=diagram_public_only,
-            diagram_group_by_module=diagram_group_by_module,
-            diagram_max_classes=int(diagram_max_classes or 0),
-        )
-
         if use_llm:
-            diagram_text = DiagramAI(generator=generator).generate_with_llm(project)
+            diagram_text = _shared_diagram_ai(
+                diagram_public_only=diagram_public_only,
+                diagram_group_by_module=diagram_group_by_module,
+                diagram_max_classes=int(diagram_max_classes or 0),
+                cache_dir=settings.llm_cache_dir,
+                stream=settings.llm_stream,
+            ).generate_with_llm(project)
         else:
+            generator = _build_plantuml_generator(
+                diagram_public_only=diagram_public_only,
+                diagram_group_by_module=diagram_group_by_module,
+                diagram_max_classes=int(diagram_max_classes or 0),
+            )
             diagram_text = generator.generate_class_diagram(project)
 
     else:
@@ -286,6 +384,7 @@ def analyze_github_project(
     workspace_dir: Path | None = None,
     timeout_sec: int = 180,
     cache_ttl_hours: int = 72,
+    partial_clone: bool = False,
 ) -> dict[str, Any]:
     """
     Анализирует GitHub-репозиторий:
@@ -300,6 +399,7 @@ def analyze_github_project(
         workspace_dir=workspace_dir,
         timeout_sec=timeout_sec,
         cache_ttl_hours=cache_ttl_hours,
+        partial_clone=partial_clone,
     )
     fetched = fetcher.fetch(repo_url, ref=ref)
 
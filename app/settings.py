@@ -26,6 +26,9 @@ class Settings(BaseSettings):
     github_fetcher_allow_clone: bool = False
     github_fetcher_workspace_dir: Path = Path(".cache") / "repos"
     github_fetcher_timeout_sec: int = 180
+    # Partial clone (--filter=blob:none) + sparse-checkout только .py/dependency-файлов:
+    # большие не-Python файлы репозитория не скачиваются.
+    github_fetcher_partial_clone: bool = False
 
     # Cache cleanup (TTL для клонов в workspace_dir)
     github_fetcher_cache_ttl_hours: int = 72  # 3 days
@@ -37,6 +40,23 @@ class Settings(BaseSettings):
     # Любые пути вне analysis_root должны быть отклонены (см. service._enforce_analysis_root).
     analysis_root: Path | None = None
 
+    # ---------------------------------------------------------------------
+    # Code parser
+    # ---------------------------------------------------------------------
+    # Дисковый кэш разобранных модулей (ключ — хэш исходника). None -> кэш выключен.
+    parser_cache_dir: Path | None = None
+    # Число процессов для разбора файлов. По умолчанию 1 — последовательный разбор без пула.
+    # Включить пул: PARSER_MAX_WORKERS=N в окружении/.env (N > 1, обычно число CPU);
+    # пул один на процесс сервиса, процессы стартуют через forkserver/spawn.
+    # None (только из кода) -> по числу CPU.
+    parser_max_workers: int | None = 1
+    # Потоки сканера для чтения директорий наперёд (1 -> последовательный обход).
+    scanner_max_workers: int = 1
+    # Список файлов из `git ls-files` (если анализируемый путь — git-репозиторий).
+    scanner_use_git: bool = False
+    # Дисковый кэш результата сканирования (проверка по mtime). None -> кэш выключен.
+    scanner_cache_dir: Path | None = None
+
     # ---------------------------------------------------------------------
     # LLM settings (optional)
     # ---------------------------------------------------------------------
@@ -45,6 +65,11 @@ class Settings(BaseSettings):
     llm_api_key: str | None = None   # локальным моделям обычно не нужен
     llm_model: str = "gpt-4.1-mini"
     llm_timeout_sec: int = 120
+    # Читать ответ LLM потоком (stream=True) и обрывать его, как только диаграмма получена
+    # или стало ясно, что её не будет. Нужен сервер с поддержкой SSE-стриминга.
+    llm_stream: bool = False
+    # Дисковый кэш проверенных ответов LLM (ключ — хэш промпта и модели). None -> кэш выключен.
+    llm_cache_dir: Path | None = None
 
     # ---------------------------------------------------------------------
     # Validators
@@ -74,11 +99,13 @@ class Settings(BaseSettings):
 
         return p
 
-    @field_validator("github_fetcher_workspace_dir", mode="before")
+    @field_validator(
+        "github_fetcher_workspace_dir", "parser_cache_dir", "scanner_cache_dir", "llm_cache_dir", mode="before"
+    )
     @classmethod
     def _validate_workspace_dir(cls, v):
         """
-        Нормализует workspace dir для кэшей git-клонов.
+        Нормализует директории кэшей (git-клоны, дисковый кэш парсера и сканера, кэш ответов LLM).
 
         Важно:
         - директория может ещё не существовать — это нормально (создаётся лениво при fetch()).
@@ -10,6 +10,10 @@ from typing import Optional
 # Мы якорим regex на комментарий, чтобы уменьшить количество ложных совпадений.
 _PEP263_LINE_RE = re.compile(r"^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)", re.IGNORECASE)
 
+# Первые две строки файла (с концами строк) — без разбиения всего файла на строки.
+# Концы строк те же, что у bytes.splitlines: \r\n, \r, \n.
+_HEAD_LINES_RE = re.compile(rb"([^\r\n]*(?:\r\n?|\n)?)([^\r\n]*(?:\r\n?|\n)?)")
+
 # UTF-8 BOM (Byte Order Mark)
 _UTF8_BOM = "\ufeff"
 _UTF8_BOM_BYTES = b"\xef\xbb\xbf"
@@ -73,10 +77,13 @@ def read_python_source(path: Path, *, max_bytes: int = DEFAULT_MAX_BYTES) -> Sou
 
     Возвращает SourceText с флагом `truncated`.
     """
-    raw = path.read_bytes()
+    limited = max_bytes is not None and max_bytes > 0
+    with path.open("rb") as f:
+        # Читаем не больше max_bytes + 1: лишний байт нужен только чтобы заметить усечение.
+        raw = f.read(max_bytes + 1) if limited else f.read()
 
     truncated = False
-    if max_bytes is not None and max_bytes > 0 and len(raw) > max_bytes:
+    if limited and len(raw) > max_bytes:
         raw = raw[:max_bytes]
         truncated = True
 
@@ -89,9 +96,10 @@ def read_python_source(path: Path, *, max_bytes: int = DEFAULT_MAX_BYTES) -> Sou
 
     # Detect encoding from first two lines per PEP-263.
     # Декодируем заголовок как latin-1, чтобы сохранить 1:1 отображение байтов в символы.
-    head = raw.splitlines(True)[:2]  # keep line endings
-    line1 = head[0].decode("latin-1", errors="ignore") if len(head) >= 1 else ""
-    line2 = head[1].decode("latin-1", errors="ignore") if len(head) >= 2 else ""
+    head = _HEAD_LINES_RE.match(raw)
+    assert head is not None  # regex допускает пустое совпадение
+    line1 = head.group(1).decode("latin-1")
+    line2 = head.group(2).decode("latin-1")
     pep263 = _detect_pep263_encoding_from_lines(line1, line2)
 
     if pep263:
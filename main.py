@@ -208,6 +208,7 @@ async def analyze_github(request: AnalyzeGitHubRequest):
             workspace_dir=settings.github_fetcher_workspace_dir,
             timeout_sec=settings.github_fetcher_timeout_sec,
             cache_ttl_hours=settings.github_fetcher_cache_ttl_hours,
+            partial_clone=settings.github_fetcher_partial_clone,
         )
     except InvalidRepoUrl as e:
         raise HTTPException(status_code=422, detail=str(e)) from e
@@ -235,6 +236,7 @@ async def analyze_github_diagram(request: AnalyzeGitHubRequest):
             workspace_dir=settings.github_fetcher_workspace_dir,
             timeout_sec=settings.github_fetcher_timeout_sec,
             cache_ttl_hours=settings.github_fetcher_cache_ttl_hours,
+            partial_clone=settings.github_fetcher_partial_clone,
         )
     except InvalidRepoUrl as e:
         raise HTTPException(status_code=422, detail=str(e)) from e
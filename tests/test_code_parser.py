@@ -205,3 +205,338 @@ def test_parse_file_syntax_error_does_not_crash(tmp_path: Path) -> None:
     # optional metadata: parse_error may exist
     if hasattr(m, "parse_error"):
         assert "SyntaxError" in getattr(m, "parse_error")
+
+
+def test_type_names_cache_is_shared_between_files(tmp_path: Path) -> None:
+    """
+    Кэш имён типов (type_str -> names) живёт на CodeParser и переиспользуется между файлами,
+    не влияя на результат: композиции находятся в каждом модуле.
+    """
+    file1 = tmp_path / "a.py"
+    file2 = tmp_path / "b.py"
+    src = "class A:\n    def __init__(self):\n        self.x = y = Service()\n"
+    file1.write_text(src, encoding="utf-8")
+    file2.write_text(src.replace("class A", "class B"), encoding="utf-8")
+
+    parser = CodeParser()
+    project = parser.parse_files([file1, file2])
+
+    targets = [{c.target for cls in m.classes for c in cls.compositions} for m in project.modules]
+    assert targets == [{"Service"}, {"Service"}]
+    assert parser._type_names_cache["Service"] == ("Service",)
+
+
+def test_nested_statements_are_still_visited(tmp_path: Path) -> None:
+    """
+    generic_visit обходит только statement-поля, но вложенные if/try/with/match
+    по-прежнему должны находиться.
+    """
+    file_path = tmp_path / "nested.py"
+    file_path.write_text(
+        "try:\n"
+        "    import fast_json as json\n"
+        "except ImportError:\n"
+        "    import json\n"
+        "\n"
+        "if True:\n"
+        "    class A:\n"
+        "        def __init__(self):\n"
+        "            with open('x') as f:\n"
+        "                self.b = B()\n"
+        "\n"
+        "match 1:\n"
+        "    case 1:\n"
+        "        def f():\n"
+        "            pass\n",
+        encoding="utf-8",
+    )
+
+    m = CodeParser().parse_file(file_path)
+
+    assert m.imports == ["import fast_json as json", "import json"]
+    assert [c.name for c in m.classes] == ["A"]
+    assert {(c.attribute, c.target) for c in m.classes[0].compositions} == {("b", "B")}
+    assert [f.name for f in m.functions] == ["f"]
+
+
+def test_parse_files_parallel_preserves_order(tmp_path: Path) -> None:
+    """
+    Пул процессов не должен менять порядок модулей и их содержимое.
+    """
+    files = []
+    for i in range(6):
+        f = tmp_path / f"m{i}.py"
+        f.write_text(f"def f{i}():\n    return {i}\n", encoding="utf-8")
+        files.append(f)
+
+    parallel = CodeParser(max_workers=2, parallel_min_files=1).parse_files(files)
+    sequential = CodeParser(max_workers=1).parse_files(files)
+
+    assert [m.path for m in parallel.modules] == [f.resolve() for f in files]
+    assert [[fn.name for fn in m.functions] for m in parallel.modules] == [
+        [fn.name for fn in m.functions] for m in sequential.modules
+    ]
+
+
+def test_parse_files_keep_pool_reuses_spawned_pool(tmp_path: Path) -> None:
+    """
+    keep_pool: один пул (spawn, без fork) обслуживает несколько вызовов parse_files
+    и останавливается через close().
+    """
+    parser = CodeParser(max_workers=2, parallel_min_files=1, mp_start_method="spawn", keep_pool=True)
+    try:
+        first = []
+        for i in range(3):
+            f = tmp_path / f"a{i}.py"
+            f.write_text(f"def a{i}():\n    return {i}\n", encoding="utf-8")
+            first.append(f)
+        parser.parse_files(first)
+        pool = parser._pool
+        assert pool is not None
+
+        second = tmp_path / "b.py"
+        second.write_text("class B:\n    pass\n", encoding="utf-8")
+        project = parser.parse_files([second, *first])
+
+        assert parser._pool is pool
+        assert [m.path for m in project.modules] == [p.resolve() for p in [second, *first]]
+        assert [c.name for c in project.modules[0].classes] == ["B"]
+    finally:
+        parser.close()
+    assert parser._pool is None
+
+
+def test_disk_cache_reuses_parsed_module(tmp_path: Path) -> None:
+    """
+    Дисковый кэш: повторный парсинг неизменённого исходника берётся из кэша,
+    а путь модуля подставляется текущий (ключ зависит только от содержимого).
+    """
+    cache_dir = tmp_path / "cache"
+    src = "class A:\n    def m(self):\n        pass\n"
+    f1 = tmp_path / "a.py"
+    f2 = tmp_path / "b.py"
+    f1.write_text(src, encoding="utf-8")
+    f2.write_text(src, encoding="utf-8")
+
+    first = CodeParser(cache_dir=cache_dir).parse_file(f1)
+    assert len(list(cache_dir.glob("*.pkl"))) == 1
+
+    second = CodeParser(cache_dir=cache_dir).parse_file(f2)
+    assert second.path == f2.resolve()
+    assert [c.name for c in second.classes] == [c.name for c in first.classes]
+
+    f1.write_text(src + "\nclass B:\n    pass\n", encoding="utf-8")
+    changed = CodeParser(cache_dir=cache_dir).parse_file(f1)
+    assert [c.name for c in changed.classes] == ["A", "B"]
+
+
+def test_attribute_dedup_is_per_class_instance(tmp_path: Path) -> None:
+    """
+    Дедупликация атрибутов ведётся по каждому ClassInfo отдельно:
+    переопределённый класс с тем же именем получает свои атрибуты.
+    """
+    file_path = tmp_path / "redef.py"
+    file_path.write_text(
+        "if cond:\n"
+        "    class A:\n"
+        "        x = Foo()\n"
+        "else:\n"
+        "    class A:\n"
+        "        x = Foo()\n"
+        "        x = Bar()\n",
+        encoding="utf-8",
+    )
+
+    m = CodeParser().parse_file(file_path)
+
+    assert [[a.name for a in c.attributes] for c in m.classes] == [["x"], ["x"]]
+    assert [[c2.target for c2 in c.compositions] for c in m.classes] == [["Foo"], ["Foo", "Bar"]]
+
+
+def test_parser_hooks_run_in_the_same_walk(tmp_path: Path) -> None:
+    """
+    Хуки получают узлы заявленных типов в том же обходе, а штатная обработка не ломается.
+    """
+    import ast
+
+    file_path = tmp_path / "hooks.py"
+    file_path.write_text(
+        "import os\n"
+        "class A:\n"
+        "    def m(self):\n"
+        "        return 1\n"
+        "def f():\n"
+        "    return 2\n",
+        encoding="utf-8",
+    )
+
+    seen: list[str] = []
+
+    def on_return(node: ast.AST) -> None:
+        seen.append(type(node).__name__)
+
+    on_return.handles = (ast.Return, ast.ClassDef)  # type: ignore[attr-defined]
+
+    m = CodeParser().parse_files([file_path], hooks=[on_return]).modules[0]
+
+    assert seen == ["ClassDef", "Return", "Return"]
+    assert [c.name for c in m.classes] == ["A"]
+    assert [f.name for f in m.functions] == ["f"]
+
+
+def test_fallback_read_when_text_loader_fails(tmp_path: Path, monkeypatch) -> None:
+    """
+    Если основной загрузчик исходников упал, файл читается напрямую как UTF-8 (errors=replace),
+    а причина попадает в source_error.
+    """
+    import app.code_parser as code_parser
+
+    def broken_loader(path: Path):
+        raise OSError("boom")
+
+    monkeypatch.setattr(code_parser, "_read_python_source", broken_loader)
+
+    file_path = tmp_path / "latin.py"
+    file_path.write_bytes(b"class A:\n    name = '\xff'\n")
+
+    m = CodeParser().parse_file(file_path)
+
+    assert [c.name for c in m.classes] == ["A"]
+    assert m.source_used_fallback is True
+    assert m.source_error is not None and "text_loader_failed" in m.source_error
+
+
+def test_memo_skips_unchanged_files_and_sees_changes(tmp_path: Path) -> None:
+    """
+    In-memory memo по (path, mtime, size): неизменённый файл не разбирается повторно,
+    изменённый — разбирается заново.
+    """
+    import os
+
+    file_path = tmp_path / "memo.py"
+    file_path.write_text("class A:\n    pass\n", encoding="utf-8")
+
+    parser = CodeParser()
+    first = parser.parse_file(file_path)
+    assert parser.parse_file(file_path) == first
+
+    file_path.write_text("class A:\n    pass\nclass B:\n    pass\n", encoding="utf-8")
+    st = file_path.stat()
+    os.utime(file_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    second = parser.parse_file(file_path)
+    assert second is not first
+    assert [c.name for c in second.classes] == ["A", "B"]
+
+
+def test_memo_hit_returns_independent_copy(tmp_path: Path) -> None:
+    """
+    Парсер общий для запросов сервиса: изменение результата одним вызывающим
+    не должно быть видно следующему вызову из memo.
+    """
+    file_path = tmp_path / "memo.py"
+    file_path.write_text("class A:\n    x: int = 1\n", encoding="utf-8")
+
+    parser = CodeParser()
+    first = parser.parse_files([file_path]).modules[0]
+    first.classes[0].name = "Mutated"
+    first.classes[0].attributes.clear()
+    first.classes.append(ClassInfo(name="Extra"))
+
+    second = parser.parse_files([file_path]).modules[0]
+    assert [c.name for c in second.classes] == ["A"]
+    assert second.classes[0].attributes
+
+    second.imports.append("import os")
+    assert parser.parse_file(file_path).imports == []
+
+
+def test_complex_bases_decorators_and_annotations_are_unparsed(tmp_path: Path) -> None:
+    """
+    Сложные выражения (subscript/call) идут через кэшируемый ast.unparse,
+    простые dotted-имена — через быстрый путь; результат одинаково читаемый.
+    """
+    file_path = tmp_path / "complex.py"
+    file_path.write_text(
+        "class A(Generic[T], pkg.Base, metaclass=Meta):\n"
+        "    @app.get('/x')\n"
+        "    @functools.cache\n"
+        "    def m(self):\n"
+        "        self.items: Optional[List[Path]] = None\n",
+        encoding="utf-8",
+    )
+
+    m = CodeParser().parse_file(file_path)
+    a = m.classes[0]
+
+    assert a.bases == ["Generic[T]", "pkg.Base"]
+    assert a.methods[0].decorators == ["app.get('/x')", "functools.cache"]
+    assert [(x.name, x.type) for x in a.attributes] == [("items", "Optional[List[Path]]")]
+    assert {c.target for c in a.compositions} == {"Optional", "List", "Path"}
+
+
+def test_parser_accepts_current_interpreter_syntax(tmp_path: Path) -> None:
+    """
+    Грамматика не закреплена на старой feature_version: синтаксис 3.11+ (except*)
+    разбирается, а не превращается в parse_error.
+    """
+    file_path = tmp_path / "modern.py"
+    file_path.write_text(
+        "class Runner:\n"
+        "    def run(self):\n"
+        "        try:\n"
+        "            pass\n"
+        "        except* ValueError:\n"
+        "            pass\n",
+        encoding="utf-8",
+    )
+
+    m = CodeParser().parse_file(file_path)
+
+    assert m.parse_error is None
+    assert [c.name for c in m.classes] == ["Runner"]
+    assert [f.name for f in m.classes[0].methods] == ["run"]
+
+
+def test_parse_decorators_can_be_disabled(tmp_path: Path) -> None:
+    """
+    parse_decorators=False пропускает unparse декораторов, но не остальную структуру;
+    в общем дисковом кэше такие модели не смешиваются с полными.
+    """
+    cache_dir = tmp_path / "cache"
+    file_path = tmp_path / "deco.py"
+    file_path.write_text(
+        "@dataclass\n"
+        "class A(Base):\n"
+        "    @property\n"
+        "    def x(self):\n"
+        "        return 1\n",
+        encoding="utf-8",
+    )
+
+    lean = CodeParser(cache_dir=cache_dir, parse_decorators=False).parse_file(file_path)
+    assert lean.classes[0].bases == ["Base"]
+    assert [f.name for f in lean.classes[0].methods] == ["x"]
+    assert lean.classes[0].methods[0].decorators == []
+
+    full = CodeParser(cache_dir=cache_dir).parse_file(file_path)
+    assert full.classes[0].methods[0].decorators == ["property"]
+
+
+def test_type_names_cache_is_bounded(tmp_path: Path, monkeypatch) -> None:
+    """
+    Кэш type_str -> имена типов общий для всех файлов парсера, но не растёт без предела.
+    """
+    import app.code_parser as code_parser
+
+    monkeypatch.setattr(code_parser, "_TYPE_NAMES_CACHE_MAX", 4)
+    parser = CodeParser()
+    for i in range(10):
+        f = tmp_path / f"m{i}.py"
+        f.write_text(
+            f"class C{i}:\n    def __init__(self):\n        self.a = A{i}()\n        self.b = pkg.B{i}()\n",
+            encoding="utf-8",
+        )
+        parser.parse_file(f)
+
+    assert 0 < len(parser._type_names_cache) <= 4
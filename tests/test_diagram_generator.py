@@ -1,8 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import io
+import json
+import threading
 from pathlib import Path
 
-from app.diagram_generator import DiagramGenerator
+import pytest
+
+from app.diagram_generator import (
+    DiagramAI,
+    DiagramGenerator,
+    _class_score,
+    _entry_score,
+    _extract_plantuml,
+    _short_class_name,
+    render_all,
+)
+from app.diagram_generator_mermaid import MermaidDiagramGenerator
 from app.models import ClassInfo, CompositionInfo, FunctionInfo, ModuleInfo, ProjectModel
 
 
@@ -93,3 +108,289 @@ def test_diagram_generator_produces_valid_plantuml() -> None:
     assert "class Base" in plantuml
     assert "class Child" in plantuml
     assert "Child --|> Base" in plantuml
+
+
+def test_diagram_generator_emits_relations_in_discovery_order() -> None:
+    """
+    Связи дедуплицируются с сохранением порядка обнаружения (без сортировки).
+    """
+    z = ClassInfo(name="Z", bases=[], methods=[], lineno=1)
+    a = ClassInfo(name="A", bases=["Z"], methods=[], lineno=2)
+    a.compositions.append(CompositionInfo(owner="A", attribute="z2", target="Z", kind="composition"))
+    a.compositions.append(CompositionInfo(owner="A", attribute="z1", target="Z", kind="composition"))
+    a.compositions.append(CompositionInfo(owner="A", attribute="z2", target="Z", kind="composition"))
+
+    module = ModuleInfo(path=Path("m.py"), classes=[z, a], functions=[], imports=[])
+    plantuml = DiagramGenerator().generate_class_diagram(ProjectModel(modules=[module]))
+
+    relation_lines = [line for line in plantuml.splitlines() if "--" in line]
+    assert relation_lines == ["A --|> Z", 'A *-- Z : "z2"', 'A *-- Z : "z1"']
+
+
+def test_short_class_name_strips_module_path_and_generics() -> None:
+    assert _short_class_name("pkg.mod.Service") == "Service"
+    assert _short_class_name("  Repo[T]  ") == "Repo"
+    assert _short_class_name("typing.Generic[pkg.T]") == "Generic"
+    assert _short_class_name("Plain") == "Plain"
+    assert _short_class_name("") == ""
+
+
+def test_diagram_generator_streams_same_text_to_file_object() -> None:
+    """
+    generate_class_diagram_to пишет в поток тот же текст, что возвращает generate_class_diagram.
+    """
+    base = ClassInfo(name="Base", bases=[], methods=[FunctionInfo(name="run", lineno=2)], lineno=1)
+    child = ClassInfo(name="Child", bases=["pkg.Base"], methods=[], lineno=5)
+    module = ModuleInfo(path=Path("m.py"), classes=[base, child], functions=[], imports=[])
+    project = ProjectModel(modules=[module])
+    gen = DiagramGenerator()
+
+    for kwargs in ({}, {"group_by_module": True}, {"show_relations": False}):
+        buf = io.StringIO()
+        gen.generate_class_diagram_to(project, buf, **kwargs)
+        assert buf.getvalue() == gen.generate_class_diagram(project, **kwargs)
+
+
+class _CountingLLM:
+    """
+    Фейковый LLM-клиент: считает вызовы и возвращает ответ в fenced-блоке.
+    """
+
+    api_base = "http://llm.local"
+    model = "test-model"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def is_enabled(self) -> bool:
+        return True
+
+    def chat(self, prompt: str) -> str:
+        self.calls += 1
+        return "```plantuml\n@startuml\nclass Improved\n@enduml\n```"
+
+
+def test_diagram_ai_reuses_cached_llm_answer(tmp_path: Path) -> None:
+    """
+    С cache_dir валидный ответ LLM сохраняется: для того же проекта повторного запроса нет,
+    а изменённый проект (другой baseline) идёт в LLM заново.
+    """
+    module = ModuleInfo(path=Path("m.py"), classes=[ClassInfo(name="A", bases=[], methods=[], lineno=1)])
+    project = ProjectModel(modules=[module])
+    client = _CountingLLM()
+
+    first = DiagramAI(client=client, cache_dir=tmp_path).generate_with_llm(project)
+    second = DiagramAI(client=client, cache_dir=tmp_path).generate_with_llm(project)
+
+    assert first == second == "@startuml\nclass Improved\n@enduml"
+    assert client.calls == 1
+
+    module.classes.append(ClassInfo(name="B", bases=[], methods=[], lineno=2))
+    DiagramAI(client=client, cache_dir=tmp_path).generate_with_llm(project)
+    assert client.calls == 2
+
+
+class _BatchLLM(_CountingLLM):
+    """
+    Фейковый LLM для пакетного режима: отвечает JSON-массивом, пропуская id=1.
+    """
+
+    def chat(self, prompt: str) -> str:
+        self.calls += 1
+        items = json.loads(prompt.rsplit("\n", 1)[1])
+        answer = [
+            {"id": item["id"], "puml": f"@startuml\nclass Improved{item['id']}\n@enduml"}
+            for item in items
+            if item["id"] != 1
+        ]
+        return "```json\n" + json.dumps(answer) + "\n```"
+
+
+def test_diagram_ai_batch_uses_one_request_and_falls_back_per_project() -> None:
+    """
+    Несколько проектов уходят одним запросом; проект без валидного ответа получает свой baseline.
+    """
+    projects = [
+        ProjectModel(modules=[ModuleInfo(path=Path(f"m{i}.py"), classes=[ClassInfo(name=f"C{i}", lineno=1)])])
+        for i in range(3)
+    ]
+    client = _BatchLLM()
+    ai = DiagramAI(client=client)
+
+    results = ai.generate_with_llm_batch(projects)
+
+    assert client.calls == 1
+    assert results[0] == "@startuml\nclass Improved0\n@enduml"
+    assert results[1] == DiagramGenerator().generate_class_diagram(projects[1])
+    assert results[2] == "@startuml\nclass Improved2\n@enduml"
+
+
+class _MalformedIdBatchLLM(_CountingLLM):
+    """
+    Фейковый LLM для пакетного режима: id приходят списком и bool вместо int.
+    """
+
+    def chat(self, prompt: str) -> str:
+        self.calls += 1
+        answer = [
+            {"id": [0], "puml": "@startuml\nclass FromList\n@enduml"},
+            {"id": True, "puml": "@startuml\nclass FromBool\n@enduml"},
+            {"id": 2, "puml": "@startuml\nclass Improved2\n@enduml"},
+        ]
+        return json.dumps(answer)
+
+
+def test_diagram_ai_batch_ignores_non_int_ids() -> None:
+    """
+    id-список не роняет метод (unhashable), id=True не принимается за 1: эти проекты получают baseline.
+    """
+    projects = [
+        ProjectModel(modules=[ModuleInfo(path=Path(f"m{i}.py"), classes=[ClassInfo(name=f"C{i}", lineno=1)])])
+        for i in range(3)
+    ]
+    ai = DiagramAI(client=_MalformedIdBatchLLM())
+
+    results = ai.generate_with_llm_batch(projects)
+
+    assert results[0] == DiagramGenerator().generate_class_diagram(projects[0])
+    assert results[1] == DiagramGenerator().generate_class_diagram(projects[1])
+    assert results[2] == "@startuml\nclass Improved2\n@enduml"
+
+
+class _ConcurrentLLM(_CountingLLM):
+    """
+    Фейковый LLM, который отвечает, только если два запроса идут одновременно
+    (последовательные вызовы упрутся в таймаут барьера и получат baseline).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def chat(self, prompt: str) -> str:
+        self.barrier.wait()
+        return super().chat(prompt)
+
+
+def test_diagram_ai_generate_many_runs_requests_concurrently() -> None:
+    projects = [
+        ProjectModel(modules=[ModuleInfo(path=Path(f"m{i}.py"), classes=[ClassInfo(name=f"C{i}", lineno=1)])])
+        for i in range(2)
+    ]
+    client = _ConcurrentLLM()
+
+    results = asyncio.run(DiagramAI(client=client).generate_many(projects, max_concurrency=2))
+
+    assert client.calls == 2
+    assert results == ["@startuml\nclass Improved\n@enduml"] * 2
+
+
+class _StreamingLLM(_CountingLLM):
+    """
+    Фейковый потоковый LLM: отдаёт заранее заданные чанки и запоминает, сколько их прочитано.
+    """
+
+    def __init__(self, chunks: list[str]) -> None:
+        super().__init__()
+        self.chunks = chunks
+        self.consumed = 0
+        self.closed = False
+
+    def chat_stream(self, prompt: str):
+        self.calls += 1
+        try:
+            for chunk in self.chunks:
+                self.consumed += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+def test_diagram_ai_stream_stops_after_enduml() -> None:
+    project = ProjectModel(modules=[ModuleInfo(path=Path("m.py"), classes=[ClassInfo(name="A", lineno=1)])])
+    client = _StreamingLLM(["```plant", "uml\n@star", "tuml\nclass B\n@end", "uml\n```", "\nlong tail"])
+
+    result = DiagramAI(client=client, stream=True).generate_with_llm(project)
+
+    assert result == "@startuml\nclass B\n@enduml"
+    assert client.consumed == 4
+    assert client.closed
+
+
+def test_diagram_ai_stream_aborts_on_foreign_code_block() -> None:
+    project = ProjectModel(modules=[ModuleInfo(path=Path("m.py"), classes=[ClassInfo(name="A", lineno=1)])])
+    client = _StreamingLLM(["```python\n", "print('hi')\n", "@startuml\n@enduml"])
+
+    result = DiagramAI(client=client, stream=True).generate_with_llm(project)
+
+    assert result == DiagramGenerator().generate_class_diagram(project)
+    assert client.consumed == 1
+    assert client.closed
+
+
+def test_diagram_ai_memory_cache_skips_repeat_requests() -> None:
+    """
+    In-memory LRU работает и без дискового кэша: тот же объект не ходит в LLM повторно;
+    memory_cache_size=0 выключает его.
+    """
+    project = ProjectModel(modules=[ModuleInfo(path=Path("m.py"), classes=[ClassInfo(name="A", lineno=1)])])
+
+    client = _CountingLLM()
+    ai = DiagramAI(client=client)
+    assert ai.generate_with_llm(project) == ai.generate_with_llm(project)
+    assert client.calls == 1
+
+    uncached = _CountingLLM()
+    ai = DiagramAI(client=uncached, memory_cache_size=0)
+    ai.generate_with_llm(project)
+    ai.generate_with_llm(project)
+    assert uncached.calls == 2
+
+
+def test_extract_plantuml_takes_first_fenced_block() -> None:
+    """
+    Берётся содержимое первого fenced-блока; строка языка отбрасывается только для plantuml/puml.
+    """
+    diagram = "@startuml\nclass A {\n}\n@enduml"
+
+    assert _extract_plantuml(f"Вот:\n```PlantUML\n{diagram}\n```\nи ещё ```x```") == diagram
+    assert _extract_plantuml(f"```\n{diagram}\n```") == diagram
+    assert _extract_plantuml(f"  {diagram}  ") == diagram
+    # незакрытый блок — текст как есть
+    assert _extract_plantuml(f"```puml\n{diagram}") == f"```puml\n{diagram}"
+    # чужой язык не срезается, но диаграмма внутри всё равно валидна
+    assert _extract_plantuml(f"```text\n{diagram}\n```") == f"text\n{diagram}"
+    assert _extract_plantuml("```plantuml\nclass A\n```") is None
+    assert _extract_plantuml(None) is None
+
+
+def test_render_all_matches_individual_generators() -> None:
+    """
+    render_all делит один проход по проекту между бэкендами; тексты совпадают с отдельными генераторами.
+    """
+    base = ClassInfo(name="Base", bases=[], methods=[FunctionInfo(name="run", lineno=2)], lineno=1)
+    child = ClassInfo(name="Child", bases=["pkg.Base"], methods=[FunctionInfo(name="_hidden", lineno=6)], lineno=5)
+    child.compositions.append(CompositionInfo(owner="Child", attribute="base", target="Base", kind="aggregation"))
+    project = ProjectModel(
+        modules=[ModuleInfo(path=Path("pkg/m.py"), classes=[base, child], functions=[], imports=[])]
+    )
+
+    bundle = render_all(project, group_by_module=True, max_classes=2)
+
+    assert list(bundle) == ["plantuml", "mermaid"]
+    assert bundle["plantuml"] == DiagramGenerator(group_by_module=True, max_classes=2).generate_class_diagram(project)
+    assert bundle["mermaid"] == MermaidDiagramGenerator(max_classes=2).generate(project)
+    assert list(render_all(project, backends=("mermaid",))) == ["mermaid"]
+
+    with pytest.raises(ValueError):
+        render_all(project, backends=("svg",))
+
+
+def test_entry_score_matches_class_score() -> None:
+    """
+    Ключ top-N (_entry_score) обязан считать то же, что и _class_score.
+    """
+    cls = ClassInfo(name="A", bases=["B", "C"], methods=[FunctionInfo(name="f", lineno=2)], lineno=1)
+    cls.compositions.append(CompositionInfo(owner="A", attribute="b", target="B", kind="composition"))
+
+    assert _entry_score(("m.py", cls)) == _class_score(cls) == 2 + 3 * 3
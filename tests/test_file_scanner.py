@@ -1,8 +1,22 @@
 from __future__ import annotations
 
+import os
+import shutil
+import subprocess
+import sys
+import time
 from pathlib import Path
 
-from app.file_scanner import FileScanner, FileScannerConfig
+import pytest
+
+from app.file_scanner import (
+    FileScanner,
+    FileScannerConfig,
+    _FallbackRules,
+    _PathSpecRules,
+    _load_gitignore,
+    _suffix_lower,
+)
 
 
 def create_file(path: Path, content: str = "") -> None:
@@ -33,6 +47,7 @@ def test_file_scanner_finds_python_files_and_requirements(tmp_path):
     create_file(project_root / "__pycache__" / "ignored.py", "print('ignored')")
     create_file(project_root / "env" / "ignored.py", "print('ignored')")
     create_file(project_root / "node_modules" / "ignored.js", "console.log('ignored');")
+    create_file(project_root / ".tox" / "py311" / "lib" / "ignored.py", "print('ignored')")
 
     # Бинарный файл (по расширению должен быть пропущен)
     create_file(project_root / "image.png", "not a real png, but treated as binary")
@@ -53,6 +68,7 @@ def test_file_scanner_finds_python_files_and_requirements(tmp_path):
     # Проверяем, что файлы из skip-директорий не попали в результат
     assert ".git/ignored.py" not in python_files_names
     assert "__pycache__/ignored.py" not in python_files_names
+    assert ".tox/py311/lib/ignored.py" not in python_files_names
 
     # requirements.txt найден
     assert result.requirements_file is not None
@@ -184,3 +200,270 @@ def test_scan_result_is_backward_compatible(tmp_path):
     assert hasattr(result, "setup_cfg_file")
     assert hasattr(result, "dependency_files")
     assert hasattr(result, "stats")
+
+
+def test_file_scanner_binary_extensions_are_case_insensitive(tmp_path):
+    """
+    Суффикс файла и расширения из конфига сравниваются в нижнем регистре.
+    """
+    project_root = tmp_path / "project"
+    create_file(project_root / "photo.JPG", "jpg")
+    create_file(project_root / "blob.dat", "dat")
+
+    config = FileScannerConfig(binary_extensions={".jpg", ".DAT"})
+    result = FileScanner(project_root, config=config).scan()
+
+    assert result.stats.skipped_binary_ext == 2
+
+
+def test_suffix_lower_matches_pathlib():
+    """
+    _suffix_lower(name) должен совпадать с Path(name).suffix.lower() (scan() больше не строит Path на каждый файл).
+    """
+    for name in ["a.py", "A.PY", ".py", "a.", "a..py", "archive.tar.GZ", "noext", "..", ".hidden.Py"]:
+        assert _suffix_lower(name) == Path(name).suffix.lower(), name
+
+
+def test_file_scanner_parallel_listing_matches_serial(tmp_path):
+    """
+    max_workers > 1 только читает директории наперёд: результат и статистика те же, что без пула.
+    """
+    project_root = tmp_path / "project"
+    for i in range(5):
+        create_file(project_root / f"pkg{i}" / "mod.py", "x = 1\n")
+        create_file(project_root / f"pkg{i}" / "sub" / "deep.py", "y = 2\n")
+    create_file(project_root / "pkg1" / ".gitignore", "sub/\n")
+    create_file(project_root / "pkg3" / "requirements.txt", "pytest\n")
+
+    serial = FileScanner(project_root).scan()
+    parallel = FileScanner(project_root, config=FileScannerConfig(max_workers=4)).scan()
+
+    assert parallel.python_files == serial.python_files
+    assert parallel.requirements_file == serial.requirements_file
+    assert parallel.stats == serial.stats
+    assert project_root / "pkg1" / "sub" / "deep.py" not in parallel.python_files
+
+
+def test_file_scanner_rescan_picks_up_changed_gitignore(tmp_path):
+    """
+    Скомпилированные правила .gitignore кэшируются в сканере, но изменённый файл перечитывается.
+    """
+    project_root = tmp_path / "project"
+    create_file(project_root / "a.py", "print('a')")
+    create_file(project_root / "pkg" / "b.py", "print('b')")
+    create_file(project_root / "pkg" / ".gitignore", "b.py\n")
+
+    scanner = FileScanner(project_root)
+    assert {p.name for p in scanner.scan().python_files} == {"a.py"}
+
+    create_file(project_root / "pkg" / ".gitignore", "nothing-to-ignore.py\n")
+    assert {p.name for p in scanner.scan().python_files} == {"a.py", "b.py"}
+
+
+def test_fallback_gitignore_rules_last_match_wins():
+    """
+    Fallback без pathspec: правила склеены в одну регулярку, но семантика прежняя —
+    побеждает последнее совпавшее правило, dir-only правила не действуют на файлы.
+    """
+    rules = _FallbackRules(["*.py", "!keep.py", "build/", "docs/*.md"])
+
+    assert rules.evaluate("pkg/a.py", is_dir=False, current=None) is True
+    assert rules.evaluate("pkg/keep.py", is_dir=False, current=None) is False
+    assert rules.evaluate("build", is_dir=True, current=None) is True
+    assert rules.evaluate("build", is_dir=False, current=None) is None
+    assert rules.evaluate("docs/readme.md", is_dir=False, current=None) is True
+    assert rules.evaluate("src/docs/readme.md", is_dir=False, current=False) is False
+
+
+def test_pathspec_rules_match_like_pathspec():
+    """
+    Разбор простых шаблонов по компонентам (имя/суффикс) + склейка остальных
+    должны давать ровно тот же ответ, что PathSpec.match_file.
+    """
+    pathspec = pytest.importorskip("pathspec")
+    lines = ["__pycache__/", "*.py[cod]", "build/", "*.egg-info/", "*.log", "/site", "docs/_build/", "*", "!*.py", "!keep/", "secret.py"]
+    spec = pathspec.PathSpec.from_lines("gitwildmatch", lines)
+    rules = _PathSpecRules.from_spec(spec, lines)
+    assert rules is not None
+
+    for rel in [
+        "a.py", "secret.py", "pkg/secret.py", "pkg/__pycache__/m.pyc", "build/x.py", "src/build",
+        "x.egg-info/PKG-INFO", "logs/app.log", "site/index.py", "src/site/a.py", "docs/_build/a.py",
+        "keep/data.txt", "notes.txt", "a/b/c/d.py",
+    ]:
+        assert rules.match_file(rel) == spec.match_file(rel), rel
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_file_scanner_use_git_lists_files_via_git(tmp_path):
+    """
+    use_git=True: файлы берутся из `git ls-files` (игнор считает git), остальные фильтры те же;
+    вне репозитория — обычный обход.
+    """
+    project_root = tmp_path / "project"
+    create_file(project_root / "main.py", "print('hello')")
+    create_file(project_root / "pkg" / "mod.py", "x = 1\n")
+    create_file(project_root / "pkg" / "generated.py", "y = 2\n")
+    create_file(project_root / "venv" / "lib.py", "z = 3\n")
+    create_file(project_root / "image.png", "png")
+    create_file(project_root / "requirements.txt", "pytest\n")
+    create_file(project_root / "pkg" / "requirements.txt", "nested\n")
+    create_file(project_root / ".gitignore", "generated.py\n")
+
+    config = FileScannerConfig(use_git=True)
+    outside = FileScanner(project_root, config=config).scan()
+    names = {p.relative_to(project_root).as_posix() for p in outside.python_files}
+    assert names == {"main.py", "pkg/mod.py"}
+
+    subprocess.run(["git", "init", "-q", str(project_root)], check=True)
+    # tracked-файл git отдаёт, даже если он подходит под .gitignore
+    subprocess.run(["git", "-C", str(project_root), "add", "-f", "pkg/generated.py"], check=True)
+    inside = FileScanner(project_root, config=config).scan()
+
+    names = {p.relative_to(project_root).as_posix() for p in inside.python_files}
+    assert names == {"main.py", "pkg/mod.py", "pkg/generated.py"}
+    assert inside.requirements_file == project_root / "requirements.txt"
+    assert inside.stats.skipped_by_dir_rule == 1
+    assert inside.stats.skipped_binary_ext == 1
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_file_scanner_use_git_falls_back_for_root_ignored_by_parent_repo(tmp_path):
+    """
+    root внутри родительского репозитория, который его игнорирует: git ничего не перечислит,
+    поэтому use_git откатывается на обычный обход; неигнорируемая поддиректория идёт через git.
+    """
+    outer = tmp_path / "outer"
+    create_file(outer / ".gitignore", "vendor/\n")
+    create_file(outer / "vendor" / "proj" / "a.py", "x = 1\n")
+    create_file(outer / "src" / "b.py", "y = 2\n")
+    subprocess.run(["git", "init", "-q", str(outer)], check=True)
+
+    config = FileScannerConfig(use_git=True)
+    ignored_root = outer / "vendor" / "proj"
+    assert FileScanner(ignored_root, config=config)._git_ls_files() is None
+    result = FileScanner(ignored_root, config=config).scan()
+    assert [p.relative_to(ignored_root).as_posix() for p in result.python_files] == ["a.py"]
+
+    assert FileScanner(outer / "src", config=config)._git_ls_files() == ["b.py"]
+
+
+def test_file_scanner_handles_tree_deeper_than_recursion_limit(tmp_path):
+    """
+    Обход идёт по явному стеку, поэтому глубина дерева не упирается в лимит рекурсии.
+    """
+    project_root = tmp_path / "project"
+    deep = project_root.joinpath(*["d"] * 400)
+    create_file(deep / "leaf.py", "x = 1\n")
+    create_file(deep / "skip.log", "noise\n")
+    create_file(project_root / ".gitignore", "*.log\n")
+
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(300)
+    try:
+        result = FileScanner(project_root).scan()
+    finally:
+        sys.setrecursionlimit(limit)
+
+    assert result.python_files == [deep / "leaf.py"]
+    assert result.stats.skipped_by_gitignore == 1
+
+
+def test_file_scanner_prunes_skip_dirs_before_gitignore(tmp_path):
+    """
+    Директории из skip_dirs отсекаются по имени ещё до .gitignore: даже если они
+    перечислены в .gitignore, счётчик пропуска — skipped_by_dir_rule.
+    """
+    project_root = tmp_path / "project"
+    create_file(project_root / ".gitignore", "venv/\nbuild/\n")
+    create_file(project_root / "venv" / "lib.py")
+    create_file(project_root / "build" / "out.py")
+    create_file(project_root / "app.py")
+
+    result = FileScanner(project_root).scan()
+
+    assert result.python_files == [project_root / "app.py"]
+    assert result.stats.skipped_by_dir_rule == 1
+    assert result.stats.skipped_by_gitignore == 1
+
+
+def test_file_scanner_sorts_python_files_like_path(tmp_path):
+    """
+    python_files упорядочены как Path (по компонентам), а не как строки: "a-b.py" идёт после "a/…".
+    """
+    project_root = tmp_path / "project"
+    for rel in ("a-b.py", "a/z.py", "a/b/c.py", "a.py"):
+        create_file(project_root / rel)
+
+    result = FileScanner(project_root).scan()
+
+    assert result.python_files == sorted(result.python_files)
+    assert [p.relative_to(project_root).as_posix() for p in result.python_files] == [
+        "a/b/c.py",
+        "a/z.py",
+        "a-b.py",
+        "a.py",
+    ]
+
+
+def _age_tree(root: Path, seconds: int = 60) -> None:
+    """Сдвигает mtime всего дерева в прошлое: свежие отметки кэш скана не сохраняет."""
+    past = time.time() - seconds
+    for p in [root, *root.rglob("*")]:
+        os.utime(p, (past, past))
+
+
+def test_file_scanner_disk_cache_hit_and_invalidation(tmp_path):
+    """
+    cache_dir: повторный scan() неизменённого дерева берёт результат из кэша;
+    новый файл, правка .gitignore или размера кандидата — промах и пересканирование.
+    """
+    project_root = tmp_path / "project"
+    create_file(project_root / "pkg" / "a.py", "a = 1\n")
+    create_file(project_root / "pkg" / "b.log", "")
+    create_file(project_root / ".gitignore", "*.log\n")
+    create_file(project_root / "requirements.txt", "requests\n")
+    _age_tree(project_root)
+    config = FileScannerConfig(cache_dir=tmp_path / "cache", max_file_size_bytes=20)
+
+    first = FileScanner(project_root, config).scan()
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    assert FileScanner(project_root, config).scan() == first
+
+    create_file(project_root / "pkg" / "c.py")
+    _age_tree(project_root)
+    assert FileScanner(project_root, config).scan().python_files == [
+        project_root / "pkg" / "a.py",
+        project_root / "pkg" / "c.py",
+    ]
+
+    create_file(project_root / ".gitignore", "*.log\nc.py\n")
+    _age_tree(project_root)
+    assert FileScanner(project_root, config).scan().python_files == [project_root / "pkg" / "a.py"]
+
+    create_file(project_root / "pkg" / "a.py", "a = 1\n" * 10)
+    _age_tree(project_root)
+    assert FileScanner(project_root, config).scan().python_files == []
+
+
+def test_file_scanner_disk_cache_skips_fresh_trees(tmp_path):
+    """Только что изменённое дерево не кэшируется: mtime может не заметить правку в тот же тик."""
+    project_root = tmp_path / "project"
+    create_file(project_root / "a.py")
+
+    FileScanner(project_root, FileScannerConfig(cache_dir=tmp_path / "cache")).scan()
+
+    assert not (tmp_path / "cache").exists()
+
+
+def test_gitignore_rules_are_shared_between_scanners(tmp_path):
+    """Скомпилированные правила .gitignore переиспользуются новым экземпляром сканера."""
+    project_root = tmp_path / "project"
+    create_file(project_root / ".gitignore", "*.log\n")
+    create_file(project_root / "a.py")
+
+    FileScanner(project_root).scan()
+    hits = _load_gitignore.cache_info().hits
+    FileScanner(project_root).scan()
+
+    assert _load_gitignore.cache_info().hits == hits + 1
@@ -0,0 +1,73 @@
+# tests/test_github_fetcher.py
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+from app.github_fetcher import GitHubFetcher
+
+
+def test_cleanup_cache_ttl_removes_only_expired_clones(tmp_path: Path) -> None:
+    """
+    TTL-очистка workspace:
+    - удаляет устаревшие директории с `.git`;
+    - не трогает свежие клоны, директории без `.git`, файлы и symlink'и.
+    """
+    (tmp_path / "expired" / ".git").mkdir(parents=True)
+    (tmp_path / "fresh" / ".git").mkdir(parents=True)
+    (tmp_path / "not_a_repo").mkdir()
+    (tmp_path / "note.txt").write_text("keep", encoding="utf-8")
+    os.symlink(tmp_path / "expired", tmp_path / "link")
+
+    past = time.time() - 100 * 3600
+    for name in ("expired", "not_a_repo"):
+        os.utime(tmp_path / name, (past, past))
+
+    GitHubFetcher(workspace_dir=tmp_path, cache_ttl_hours=72)._cleanup_cache_ttl()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fresh", "link", "not_a_repo", "note.txt"]
+
+
+def _git(*args: str, cwd: Path) -> None:
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_fetch_partial_clone_checks_out_only_analyzed_files(tmp_path: Path, monkeypatch) -> None:
+    """
+    partial_clone: в рабочее дерево попадают только .py, dependency-файлы и .gitignore;
+    кэш-директория отличается от обычного клона того же repo_url.
+    """
+    src = tmp_path / "src"
+    (src / "pkg").mkdir(parents=True)
+    (src / "pkg" / "mod.py").write_text("x = 1\n", encoding="utf-8")
+    (src / "requirements.txt").write_text("requests\n", encoding="utf-8")
+    (src / ".gitignore").write_text("*.log\n", encoding="utf-8")
+    (src / "data.bin").write_bytes(b"\0" * 1024)
+    _git("init", "-q", cwd=src)
+    _git("add", "-A", cwd=src)
+    _git("-c", "user.email=t@example.com", "-c", "user.name=t", "commit", "-qm", "init", cwd=src)
+    _git("clone", "-q", "--bare", str(src), str(tmp_path / "remote.git"), cwd=tmp_path)
+    _git("config", "uploadpack.allowFilter", "true", cwd=tmp_path / "remote.git")
+
+    # https://example.invalid/… -> локальный bare-репозиторий (без сети).
+    monkeypatch.setenv("GIT_CONFIG_COUNT", "1")
+    monkeypatch.setenv("GIT_CONFIG_KEY_0", f"url.{(tmp_path / 'remote.git').as_uri()}.insteadOf")
+    monkeypatch.setenv("GIT_CONFIG_VALUE_0", "https://example.invalid/repo")
+
+    workspace = tmp_path / "workspace"
+    fetcher = GitHubFetcher(allow_clone=True, workspace_dir=workspace, partial_clone=True)
+    result = fetcher.fetch("https://example.invalid/repo")
+
+    files = sorted(
+        p.relative_to(result.local_path).as_posix()
+        for p in result.local_path.rglob("*")
+        if p.is_file() and ".git" not in p.relative_to(result.local_path).parts
+    )
+    assert files == [".gitignore", "pkg/mod.py", "requirements.txt"]
+    assert result.local_path != GitHubFetcher(workspace_dir=workspace)._target_dir("https://example.invalid/repo", None)
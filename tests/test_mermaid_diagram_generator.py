@@ -78,3 +78,20 @@ def test_mermaid_inheritance() -> None:
     diagram = gen.generate(project)
 
     assert "Base <|-- Child" in diagram
+
+
+def test_mermaid_emits_relations_in_discovery_order() -> None:
+    """
+    Связи дедуплицируются с сохранением порядка обнаружения (без сортировки), как в PlantUML.
+    """
+    z = ClassInfo(name="Z", bases=[], methods=[], lineno=1)
+    a = ClassInfo(name="A", bases=["Z"], methods=[], lineno=2)
+    a.compositions.append(CompositionInfo(owner="A", attribute="z2", target="Z", kind="composition"))
+    a.compositions.append(CompositionInfo(owner="A", attribute="z1", target="Z", kind="composition"))
+    a.compositions.append(CompositionInfo(owner="A", attribute="z2", target="Z", kind="composition"))
+
+    module = ModuleInfo(path=Path("m.py"), classes=[z, a], functions=[], imports=[])
+    diagram = MermaidDiagramGenerator().generate(ProjectModel(modules=[module]))
+
+    relation_lines = [line for line in diagram.splitlines() if "--" in line]
+    assert relation_lines == ["Z <|-- A", "A *-- Z : z2", "A *-- Z : z1"]
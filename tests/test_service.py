@@ -37,3 +37,40 @@ def test_analyze_local_project_end_to_end(tmp_path: Path) -> None:
     assert "@startuml" in result["diagram_plantuml"]
     assert result["tech_stack"] is not None
     assert "fastapi" in result["tech_stack"]["frameworks"]
+
+
+class _CountingLLMClient:
+    calls = 0
+
+    def is_enabled(self) -> bool:
+        return True
+
+    def chat(self, prompt: str) -> str:
+        type(self).calls += 1
+        return "@startuml\nclass Improved\n@enduml"
+
+
+def test_analyze_local_project_reuses_llm_answer_across_requests(tmp_path: Path, monkeypatch) -> None:
+    """
+    DiagramAI общий для запросов с теми же настройками: повторный анализ того же
+    проекта берёт улучшенную диаграмму из in-memory LRU, без второго запроса в LLM.
+    """
+    import app.diagram_generator as diagram_generator
+    import app.service as service
+
+    monkeypatch.setattr(diagram_generator, "LLMClient", _CountingLLMClient)
+    monkeypatch.setattr(service, "_diagram_ais", {})
+    monkeypatch.setattr(service.settings, "llm_cache_dir", None)
+    monkeypatch.setattr(service.settings, "llm_stream", False)
+    monkeypatch.setattr(_CountingLLMClient, "calls", 0)
+
+    project_root = tmp_path / "project"
+    project_root.mkdir()
+    (project_root / "main.py").write_text("class Foo:\n    pass\n", encoding="utf-8")
+
+    first = analyze_local_project(project_root, use_llm=True)
+    second = analyze_local_project(project_root, use_llm=True)
+
+    assert "class Improved" in first["diagram_plantuml"]
+    assert second["diagram_plantuml"] == first["diagram_plantuml"]
+    assert _CountingLLMClient.calls == 1
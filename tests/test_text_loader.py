@@ -41,3 +41,21 @@ def test_read_python_source_fallback_never_crashes(tmp_path: Path) -> None:
     assert "x=1" in src.text
     # fallback is allowed
     assert src.encoding.startswith("utf-8")
+
+
+def test_read_python_source_truncates_at_max_bytes(tmp_path: Path) -> None:
+    """
+    Файл длиннее max_bytes читается не целиком: текст обрезан по лимиту и помечен truncated.
+    Cookie во 2-й строке после CRLF по-прежнему находится.
+    """
+    p = tmp_path / "big.py"
+    p.write_bytes(b"#!/usr/bin/env python\r\n# coding: latin-1\r\n" + b"x = 1\n" * 100)
+
+    src = read_python_source(p, max_bytes=50)
+    assert src.truncated is True
+    assert len(src.text) == 50
+    assert src.encoding == "latin-1"
+
+    full = read_python_source(p, max_bytes=10_000)
+    assert full.truncated is False
+    assert full.text.endswith("x = 1\n")